@@ -0,0 +1,85 @@
+"""
+Keyset pagination over a user's sessions for ``/activity/recent``.
+
+Pages are ordered by ``(started_at, id)`` descending. The cursor is an opaque
+URL-safe token holding the last row's key, so fetching page N costs the same
+index range scan as page 1, however far back the client scrolls.
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Challenge, Session
+from .schemas import ActivityItem
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(started_at: datetime, session_id: int) -> str:
+    raw = f"{started_at.isoformat()}|{session_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        started_at, session_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(started_at), int(session_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def recent_query(user_id: int, limit: int, cursor: str | None = None):
+    """Sessions joined to challenge titles, newest first, after ``cursor``; fetches ``limit + 1`` rows."""
+    q = (
+        select(
+            Session.id,
+            Session.challenge_id,
+            Challenge.name,
+            Session.started_at,
+            Session.duration_seconds,
+            Session.intensity,
+            Session.points,
+        )
+        .outerjoin(Challenge, Challenge.id == Session.challenge_id)
+        .where(Session.user_id == user_id)
+        .order_by(Session.started_at.desc(), Session.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        started_at, session_id = decode_cursor(cursor)
+        # Row-value comparison, so the planner seeks straight into the (user_id, started_at, id) index
+        q = q.where(tuple_(Session.started_at, Session.id) < tuple_(started_at, session_id))
+    return q
+
+
+async def recent_page(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+) -> tuple[list[ActivityItem], str | None]:
+    """One page of sessions with their challenge titles, plus the cursor for the next page."""
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    q = recent_query(user_id, limit, cursor)
+    rows = (await db.execute(q)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    items = [
+        ActivityItem(
+            id=sid,
+            challenge_id=challenge_id,
+            title=title,
+            started_at=started_at,
+            duration_minutes=duration_seconds // 60,
+            intensity=intensity,
+            points=points,
+        )
+        for sid, challenge_id, title, started_at, duration_seconds, intensity, points in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].started_at, rows[-1].id) if more else None
+    return items, next_cursor
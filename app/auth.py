@@ -1,62 +1,306 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import HTTPException, status, Depends
 from jose import jwt, JWTError
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .config import SECRET_KEY, ALGORITHM, access_token_expiry, refresh_token_expiry
+from .config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    PASSWORD_HASH_MAX_PENDING,
+    PASSWORD_HASH_WORKERS,
+    AUTH_CACHE_MAX_SIZE,
+    AUTH_CACHE_TTL_SECONDS,
+    access_token_expiry,
+    refresh_token_expiry,
+)
 from .database import get_db
-from .models import User
+from .metrics import timed
+from .models import SchemaMigration, User
 
+if TYPE_CHECKING:
+    from argon2 import PasswordHasher
 
-ph = PasswordHasher()
+# argon2 is imported on first use: only register and login hash passwords,
+# so other routes' cold starts never load it
+_hasher: "PasswordHasher | None" = None
+_hasher_lock = threading.Lock()
 
 
-def hash_password(password: str) -> str:
-    return ph.hash(password)
+def get_hasher() -> "PasswordHasher":
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                from argon2 import PasswordHasher
 
+                _hasher = PasswordHasher(
+                    time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=ARGON2_PARALLELISM,
+                )
+    return _hasher
+
+
+def _verify(hasher: "PasswordHasher", plain_password: str, hashed_password: str) -> bool:
+    from argon2.exceptions import VerifyMismatchError
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
-        return ph.verify(hashed_password, plain_password)
+        return hasher.verify(hashed_password, plain_password)
     except VerifyMismatchError:
         return False
 
 
-def create_token(subject: str, token_type: str, expires_delta: timedelta) -> str:
+def hash_password(password: str) -> str:
+    return get_hasher().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _verify(get_hasher(), plain_password, hashed_password)
+
+
+class PasswordHashPool:
+    """Runs Argon2 off the request path on a dedicated, bounded thread pool.
+
+    argon2-cffi releases the GIL while hashing, so ``workers`` threads hash in
+    parallel. At most ``max_pending`` calls may be queued or running; beyond
+    that callers get a 503 instead of piling up behind a login burst.
+
+    Without an explicit ``hasher`` the app-wide one (``get_hasher``) is
+    created on first use.
+    """
+
+    def __init__(self, hasher: "PasswordHasher | None", workers: int, max_pending: int):
+        self._hasher = hasher
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._slots = threading.BoundedSemaphore(max(max_pending, workers))
+
+    @property
+    def hasher(self) -> "PasswordHasher":
+        if self._hasher is None:
+            self._hasher = get_hasher()
+        return self._hasher
+
+    async def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            with timed("argon2"):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hasher.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, self.hasher, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return self.hasher.check_needs_rehash(hashed_password)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_pool = PasswordHashPool(None, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """Detached snapshot of the user fields authenticated endpoints need."""
+    id: int
+    username: str
+    email: str
+    token_version: int
+
+    @classmethod
+    def from_row(cls, user: User) -> "AuthUser":
+        return cls(id=user.id, username=user.username, email=user.email, token_version=user.token_version or 0)
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_user_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(user_id: int) -> None:
+    _user_cache.pop(user_id)
+
+
+def revoke_tokens(db: Session | AsyncSession, user: User) -> None:
+    """Invalidate every token issued to ``user`` (call on password change or deletion).
+
+    Bumps the token version in the caller's transaction (sync or async
+    session). Other warm instances stop accepting old tokens once their cache
+    entry expires. No endpoint changes passwords or deletes users yet, so
+    nothing calls this so far; those paths must when they are added.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    db.add(user)
+    invalidate_user(user.id)
+
+
+def create_token(subject: str, token_type: str, expires_delta: timedelta, claims: Optional[dict] = None) -> str:
     expire = datetime.now(tz=timezone.utc) + expires_delta
     to_encode = {"exp": expire, "sub": subject, "type": token_type}
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if claims:
+        to_encode.update(claims)
+    with timed("jwt"):
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
 
+def _user_claims(user_id: Optional[int], token_version: int) -> Optional[dict]:
+    if user_id is None:
+        return None
+    return {"uid": user_id, "tv": token_version}
 
-def create_access_token(subject: str) -> str:
-    return create_token(subject, "access", access_token_expiry())
 
+def create_access_token(subject: str, user_id: Optional[int] = None, token_version: int = 0) -> str:
+    return create_token(subject, "access", access_token_expiry(), _user_claims(user_id, token_version))
 
-def create_refresh_token(subject: str) -> str:
-    return create_token(subject, "refresh", refresh_token_expiry())
+
+def create_refresh_token(subject: str, user_id: Optional[int] = None, token_version: int = 0) -> str:
+    return create_token(subject, "refresh", refresh_token_expiry(), _user_claims(user_id, token_version))
 
 
 def decode_token(token: str) -> dict:
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with timed("jwt"):
+            return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 
-def get_current_user(
-    token: str, db: Session
-) -> User:
-    payload = decode_token(token)
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
+# Migration that added users.token_version (app.migrations); tokens minted
+# since then carry "uid" and "tv" claims
+TOKEN_VERSION_MIGRATION = 1
+_legacy_token_cutoff: Optional[datetime] = None
+
+
+def _reject_expired_legacy_token() -> None:
+    if _legacy_token_cutoff is not None and datetime.utcnow() >= _legacy_token_cutoff:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired, please log in again")
+
+
+async def _load_legacy_user(subject: str, db: AsyncSession) -> Optional[User]:
+    """User for a token without user-id claims, which skips the token version check.
+
+    Such tokens predate the token-version deploy; they are accepted for one
+    access-token lifetime after that migration was applied, then rejected.
+    """
+    global _legacy_token_cutoff
+    _reject_expired_legacy_token()
+    q = select(User).where(User.email == subject).limit(1)
+    if _legacy_token_cutoff is not None:
+        return await db.scalar(q)
+    # First legacy token in this process: fetch the migration time in the same query
+    migration = SchemaMigration.__table__
+    row = (await db.execute(q.add_columns(migration.c.applied_at).outerjoin(
+        migration, migration.c.version == TOKEN_VERSION_MIGRATION,
+    ))).first()
+    if row is None:
+        return None
+    if row.applied_at is not None:
+        _legacy_token_cutoff = row.applied_at.replace(tzinfo=None) + access_token_expiry()
+        _reject_expired_legacy_token()
+    return row[0]
+
+
+async def _load_user(payload: dict, db: AsyncSession) -> AuthUser:
+    """Resolve token claims to a user, via the cache when the token carries a user id."""
     subject = payload.get("sub")
     if subject is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-    user = db.query(User).filter(User.email == subject).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
\ No newline at end of file
+    user_id = payload.get("uid")
+    if user_id is None:
+        row = await _load_legacy_user(subject, db)
+        if not row:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = AuthUser.from_row(row)
+        _user_cache.set(user.id, user)
+        return user
+
+    token_version = payload.get("tv", 0)
+    user = _user_cache.get(user_id)
+    if user is None or user.token_version < token_version:
+        # Miss, or the token is newer than our cached copy
+        row = await db.get(User, user_id)
+        if not row:
+            invalidate_user(user_id)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = AuthUser.from_row(row)
+        _user_cache.set(user_id, user)
+    if user.token_version != token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return user
+
+
+async def get_current_user(
+    token: str, db: AsyncSession
+) -> AuthUser:
+    payload = decode_token(token)
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
+    return await _load_user(payload, db)
+
+
+async def get_refresh_user(token: str, db: AsyncSession) -> AuthUser:
+    payload = decode_token(token)
+    if payload.get("type") != "refresh":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    if payload.get("uid") is not None:
+        # Refreshes are rare; always confirm the token version against the database
+        invalidate_user(payload["uid"])
+    return await _load_user(payload, db)
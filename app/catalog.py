@@ -0,0 +1,164 @@
+"""
+In-process challenge catalog cache.
+
+The whole catalog (challenges plus their ordered steps) is loaded with two
+queries and kept in memory, together with per-(pillar, energy_level) pages.
+It is reloaded when the version stamp in ``catalog_state`` changes, which
+``import_csv`` bumps after every import. Warm instances only re-read the stamp
+every ``CATALOG_VERSION_TTL_SECONDS``. Readers take an ``AsyncSession``;
+``bump_version`` runs inside the (sync) importer transaction.
+
+Each page is also kept pre-encoded (JSON and gzip) with a strong ETag so the
+``/challenges`` endpoint can answer without touching Python objects at all.
+"""
+import gzip
+import hashlib
+import time
+
+import orjson
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .config import CATALOG_VERSION_TTL_SECONDS
+from .models import Challenge, ChallengeStep, CatalogState
+
+_STATE_ID = 1
+
+
+def serialize_challenge(c: Challenge, steps: list[str] | None = None) -> dict:
+    return {
+        "id": c.id,
+        "pillar": c.pillar,
+        "energy_level": c.energy_level,
+        "number": c.number,
+        "name": c.name,
+        "duration_minutes": c.duration_minutes,
+        "description": c.description,
+        "steps": steps if steps is not None else [s.text for s in c.steps],
+    }
+
+
+def bump_version(db: Session) -> int:
+    """Increment the catalog version stamp inside the caller's transaction."""
+    state = db.get(CatalogState, _STATE_ID)
+    if state is None:
+        state = CatalogState(id=_STATE_ID, version=1)
+        db.add(state)
+    else:
+        state.version = state.version + 1
+    db.flush()
+    return state.version
+
+
+class EncodedPage:
+    """Pre-encoded ``{"items": [...]}`` payload for one catalog page."""
+
+    def __init__(self, items: list[dict]):
+        self.body = orjson.dumps({"items": items})
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong validators must differ per content-coding
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+class _Snapshot:
+    """One loaded catalog version; replaced as a whole on reload."""
+
+    def __init__(self, version: int, items: list[dict]):
+        self.version = version
+        self.items = items
+        self.by_id = {item["id"]: item for item in items}
+        self.pages: dict[tuple[str | None, str | None], list[dict]] = {}
+        self.encoded: dict[tuple[str | None, str | None], EncodedPage] = {}
+
+
+class Catalog:
+    def __init__(self, ttl_seconds: float = CATALOG_VERSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: _Snapshot | None = None
+        self._checked_at = 0.0
+
+    @property
+    def version(self) -> int | None:
+        return self._snapshot.version if self._snapshot else None
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    async def _stored_version(self, db: AsyncSession) -> int:
+        version = await db.scalar(select(CatalogState.version).where(CatalogState.id == _STATE_ID))
+        return version or 0
+
+    async def _load(self, db: AsyncSession, version: int) -> _Snapshot:
+        # Steps in one plain query rather than selectinload, whose IN batches
+        # would add a round trip per 500 challenges
+        steps: dict[int, list[str]] = {}
+        for challenge_id, text in await db.execute(
+            select(ChallengeStep.challenge_id, ChallengeStep.text).order_by(ChallengeStep.challenge_id, ChallengeStep.order)
+        ):
+            steps.setdefault(challenge_id, []).append(text)
+        rows = (await db.scalars(
+            select(Challenge).order_by(Challenge.pillar, Challenge.energy_level, Challenge.number)
+        )).all()
+        return _Snapshot(version, [serialize_challenge(c, steps.get(c.id, [])) for c in rows])
+
+    def _is_fresh(self, now: float) -> bool:
+        return self._snapshot is not None and now - self._checked_at < self.ttl_seconds
+
+    async def refresh(self, db: AsyncSession, force: bool = False) -> _Snapshot:
+        # No lock: concurrent refreshes at worst load the same version twice,
+        # and each swaps in a complete snapshot.
+        now = time.monotonic()
+        snap = self._snapshot
+        if not force and snap is not None and self._is_fresh(now):
+            return snap
+        version = await self._stored_version(db)
+        if snap is None or snap.version != version:
+            snap = await self._load(db, version)
+            self._snapshot = snap
+        self._checked_at = now
+        return snap
+
+    def _page(self, snap: _Snapshot, key: tuple[str | None, str | None]) -> list[dict]:
+        page = snap.pages.get(key)
+        if page is None:
+            page = [
+                item for item in snap.items
+                if (not key[0] or item["pillar"] == key[0]) and (not key[1] or item["energy_level"] == key[1])
+            ]
+            snap.pages[key] = page
+        return page
+
+    async def list(self, db: AsyncSession, pillar: str | None = None, energy_level: str | None = None) -> list[dict]:
+        """Challenges matching the filter, ordered by pillar, energy level and number."""
+        return self._page(await self.refresh(db), (pillar or None, energy_level or None))
+
+    async def encoded(self, db: AsyncSession, pillar: str | None = None, energy_level: str | None = None) -> EncodedPage:
+        snap = await self.refresh(db)
+        key = (pillar or None, energy_level or None)
+        page = snap.encoded.get(key)
+        if page is None:
+            page = EncodedPage(self._page(snap, key))
+            snap.encoded[key] = page
+        return page
+
+    async def get(self, db: AsyncSession, challenge_id: int) -> dict | None:
+        item = (await self.refresh(db)).by_id.get(challenge_id)
+        if item is None:
+            # Unknown id: the catalog may have been re-imported since the last check
+            item = (await self.refresh(db, force=True)).by_id.get(challenge_id)
+        return item
+
+    async def get_many(self, db: AsyncSession, challenge_ids) -> dict[int, dict]:
+        """The known challenges among ``challenge_ids``, keyed by id (one refresh for the whole set)."""
+        ids = set(challenge_ids)
+        snap = await self.refresh(db)
+        if not ids <= snap.by_id.keys():
+            snap = await self.refresh(db, force=True)
+        return {i: snap.by_id[i] for i in ids if i in snap.by_id}
+
+
+catalog = Catalog()
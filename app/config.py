@@ -1,15 +1,41 @@
 import os
 from datetime import timedelta
-from dotenv import load_dotenv
 
-# Load environment variables from .env file (for local development)
-load_dotenv()
+# Load environment variables from .env file (for local development); Vercel
+# injects them directly, so cold starts skip python-dotenv entirely
+if not os.environ.get("VERCEL"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 # Configuration
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
 ALGORITHM = os.environ.get("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 REFRESH_TOKEN_EXPIRE_MINUTES = int(os.environ.get("REFRESH_TOKEN_EXPIRE_MINUTES", "10080"))
+# Argon2id cost parameters (argon2-cffi defaults); existing hashes are upgraded on login
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", "4"))
+# Dedicated password hashing pool: concurrent hashes, and how many may wait before 503
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+# In-process cache of authenticated users (see app/auth.py)
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_SIZE = int(os.environ.get("AUTH_CACHE_MAX_SIZE", "10000"))
+# How often (seconds) a warm instance re-checks the catalog version stamp in the database
+CATALOG_VERSION_TTL_SECONDS = float(os.environ.get("CATALOG_VERSION_TTL_SECONDS", "30"))
+# How long (seconds) a warm instance serves a cached leaderboard top-K page
+LEADERBOARD_CACHE_TTL_SECONDS = float(os.environ.get("LEADERBOARD_CACHE_TTL_SECONDS", "10"))
+
+# Requests slower than this are logged with their SQL statements (0 disables the log)
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "0"))
+# production | development | test
+APP_ENV = os.environ.get("APP_ENV", "production").lower()
+# Per-route SQL statement budgets (app.metrics.query_budget): raise, log or off
+QUERY_BUDGET_MODE = os.environ.get(
+    "QUERY_BUDGET_MODE", {"test": "raise", "development": "log"}.get(APP_ENV, "off")
+).lower()
 
 def _normalize_pg_url(url: str) -> str:
     """Normalize PostgreSQL URL for SQLAlchemy with psycopg driver"""
@@ -34,6 +60,39 @@ if not _database_url:
 
 DATABASE_URL = _normalize_pg_url(_database_url)
 
+
+def _async_url(url: str) -> str:
+    """Async driver URL for the same database (psycopg 3 serves both; SQLite needs aiosqlite)"""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return url
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+
+# Optional read replica for the GET endpoints (see app/replica.py); unset, everything uses DATABASE_URL
+_database_read_url = os.environ.get("DATABASE_READ_URL")
+DATABASE_READ_URL = _normalize_pg_url(_database_read_url) if _database_read_url else None
+ASYNC_DATABASE_READ_URL = _async_url(DATABASE_READ_URL) if DATABASE_READ_URL else None
+# After a write, that user's reads stay on the primary this long (allowance for replica lag)
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Connection pooling: "null" (a fresh connection per session; right for serverless,
+# where Neon's pooler does the pooling) or "queue" (long-lived uvicorn workers).
+_serverless = bool(os.environ.get("VERCEL") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"))
+DB_POOL_MODE = os.environ.get("DB_POOL_MODE", "null" if _serverless else "queue").lower()
+if DB_POOL_MODE not in ("null", "queue"):
+    raise RuntimeError("DB_POOL_MODE must be 'null' or 'queue'")
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "300"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# psycopg server-side prepared statements after N executions of a query. Transaction-mode
+# poolers (Neon "-pooler" hosts / PgBouncer) cannot keep them, so they are off there by default.
+_prepare = os.environ.get("DB_PREPARE_THRESHOLD", "none" if "-pooler" in DATABASE_URL else "5")
+DB_PREPARE_THRESHOLD = None if _prepare.lower() in ("", "none", "off") else int(_prepare)
+
 def access_token_expiry() -> timedelta:
     return timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
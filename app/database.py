@@ -1,26 +1,110 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import NullPool
-from .config import DATABASE_URL
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from .config import (
+    ASYNC_DATABASE_READ_URL,
+    ASYNC_DATABASE_URL,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_MODE,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_PREPARE_THRESHOLD,
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-# Neon Postgres engine configuration optimized for Vercel serverless
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=NullPool,  # 🔥 Required for serverless - no connection pooling
-    echo=False,
-)
+def engine_options(
+    url: str,
+    mode: str = DB_POOL_MODE,
+    is_async: bool = False,
+    prepare_threshold: int | None = DB_PREPARE_THRESHOLD,
+) -> dict:
+    """create_engine / create_async_engine keyword arguments for a pool mode.
+
+    ``null``: no pooling (Vercel serverless; Neon's pooler pools for us).
+    ``queue``: a bounded, pre-pinged, recycled pool for long-running workers.
+    """
+    opts: dict = {"echo": False}
+    if mode == "null":
+        opts["poolclass"] = NullPool
+    else:
+        opts.update(
+            poolclass=AsyncAdaptedQueuePool if is_async else QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    if "+psycopg" in url:
+        opts["connect_args"] = {"prepare_threshold": prepare_threshold}
+    return opts
+
+
+# Neon Postgres engine configuration, selected by DB_POOL_MODE (NullPool on Vercel)
+# Sync engine: init_db.py, the challenge importer and maintenance commands
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: every request handler in app/main.py
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica (DATABASE_READ_URL) for GET endpoints, via app.replica.get_read_db.
+# Read paths never write, so its sessions need no special handling; without a replica they are primary sessions.
+async_read_engine = (
+    create_async_engine(ASYNC_DATABASE_READ_URL, **engine_options(ASYNC_DATABASE_READ_URL, is_async=True))
+    if ASYNC_DATABASE_READ_URL else None
+)
+
+AsyncReadSessionLocal = (
+    async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+    if async_read_engine is not None else AsyncSessionLocal
+)
+
 def get_db():
     """Database session dependency for FastAPI"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Async database session dependency for FastAPI"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats(eng=None) -> dict:
+    """Connection pool counters for an engine (default: the request-path async engine)."""
+    pool = (eng or async_engine).pool
+    stats = {"mode": DB_POOL_MODE, "pool": type(pool).__name__, "status": pool.status()}
+    if hasattr(pool, "checkedout"):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    return stats
+
+
+
+def dialect_insert(db):
+    """Dialect-specific ``insert`` construct supporting ON CONFLICT (Postgres, SQLite)."""
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
@@ -0,0 +1,102 @@
+"""
+Streaming session export for ``/export/sessions``.
+
+One query walks the user's ``(user_id, started_at, id)`` index oldest first,
+joined to challenge names, through a server-side cursor
+(``AsyncSession.stream`` with ``yield_per``). Each fetched partition is
+encoded (NDJSON or CSV) and, optionally, gzip-compressed on the fly before
+the next one is read, so memory stays flat however long the history is.
+
+The body generator opens its own session: FastAPI closes dependency
+sessions before a streaming body is sent.
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Callable
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Challenge, Session
+
+# format: media type
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+COLUMNS = (
+    "id", "started_at", "ended_at", "challenge_id", "challenge", "pillar", "energy_level",
+    "duration_seconds", "intensity", "points",
+)
+CHUNK_ROWS = 1000
+
+
+def export_query(user_id: int, start: date | None = None, end: date | None = None):
+    """The user's sessions, oldest first; ``start`` and ``end`` are inclusive days."""
+    q = (
+        select(
+            Session.id,
+            Session.started_at,
+            Session.ended_at,
+            Session.challenge_id,
+            Challenge.name,
+            Session.pillar,
+            Session.energy_level,
+            Session.duration_seconds,
+            Session.intensity,
+            Session.points,
+        )
+        .outerjoin(Challenge, Challenge.id == Session.challenge_id)
+        .where(Session.user_id == user_id)
+        .order_by(Session.started_at, Session.id)
+    )
+    if start:
+        q = q.where(Session.started_at >= datetime.combine(start, time.min))
+    if end:
+        q = q.where(Session.started_at < datetime.combine(end + timedelta(days=1), time.min))
+    return q
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(COLUMNS, row))) + b"\n" for row in rows)
+
+
+def _csv(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(
+        (sid, started.isoformat(), ended.isoformat() if ended else "", *rest)
+        for sid, started, ended, *rest in rows
+    )
+    return buf.getvalue().encode()
+
+
+_ENCODERS = {"ndjson": _ndjson, "csv": _csv}
+
+
+async def stream(
+    sessionmaker: Callable[[], AsyncSession],
+    user_id: int,
+    fmt: str,
+    start: date | None = None,
+    end: date | None = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Body chunks of the export, about one per ``CHUNK_ROWS`` rows (a single gzip stream when ``compress``)."""
+    encode = _ENCODERS[fmt]
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def out(data: bytes) -> bytes:
+        return gz.compress(data) if gz else data
+
+    header = out((",".join(COLUMNS) + "\r\n").encode()) if fmt == "csv" else b""
+    if header:
+        yield header
+    async with sessionmaker() as db:
+        result = await db.stream(export_query(user_id, start, end).execution_options(yield_per=CHUNK_ROWS))
+        async for rows in result.partitions():
+            chunk = out(encode(rows))
+            # The compressor may buffer a whole chunk; skip empty writes
+            if chunk:
+                yield chunk
+    if gz:
+        yield gz.flush()
@@ -0,0 +1,128 @@
+"""
+Time-bucketed session histograms over ``user_daily_stats``.
+
+Every histogram is answered by a single ``GROUP BY`` query whose bucket key is
+computed in SQL:
+
+- ``day``:   one bucket per calendar day
+- ``week``:  week-of-month chunks (days 1-7, 8-14, ...), as the monthly view uses
+- ``month``: one bucket per calendar month
+"""
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import Integer, cast, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import UserDailyStat
+from .schemas import HistogramBucket
+
+GRANULARITIES = ("day", "week", "month")
+MAX_BUCKETS = 400
+
+WEEKDAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MONTH_LABELS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+class Bucket(NamedTuple):
+    key: tuple
+    start: date
+    end: date  # exclusive
+    label: str
+
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def buckets(granularity: str, start: date, end: date) -> list[Bucket]:
+    """All buckets overlapping ``[start, end)``, clipped to that range."""
+    out = []
+    if granularity == "day":
+        d = start
+        while d < end:
+            out.append(Bucket((d,), d, d + timedelta(days=1), WEEKDAY_LABELS[d.weekday()]))
+            d += timedelta(days=1)
+    elif granularity == "week":
+        month = start.replace(day=1)
+        while month < end:
+            month_end = _next_month(month)
+            idx = 0
+            chunk = month
+            while chunk < month_end:
+                chunk_end = min(chunk + timedelta(days=7), month_end)
+                if chunk_end > start and chunk < end:
+                    out.append(Bucket((month.year, month.month, idx), max(chunk, start), min(chunk_end, end), f"W{idx + 1}"))
+                idx += 1
+                chunk = chunk_end
+            month = month_end
+    elif granularity == "month":
+        month = start.replace(day=1)
+        while month < end:
+            month_end = _next_month(month)
+            out.append(Bucket((month.year, month.month), max(month, start), min(month_end, end), MONTH_LABELS[month.month - 1]))
+            month = month_end
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return out
+
+
+def _key_columns(granularity: str) -> list:
+    day = UserDailyStat.day
+    if granularity == "day":
+        return [day]
+    year = cast(extract("year", day), Integer)
+    month = cast(extract("month", day), Integer)
+    if granularity == "month":
+        return [year, month]
+    return [year, month, (cast(extract("day", day), Integer) - 1) // 7]
+
+
+async def bucket_counts(db: AsyncSession, user_id: int, granularity: str, start: date, end: date) -> dict[tuple, int]:
+    """Session counts per bucket key for ``[start, end)`` in one query."""
+    keys = _key_columns(granularity)
+    rows = (await db.execute(
+        select(*keys, func.sum(UserDailyStat.sessions)).where(
+            UserDailyStat.user_id == user_id,
+            UserDailyStat.day >= start,
+            UserDailyStat.day < end,
+        ).group_by(*keys)
+    )).all()
+    return {tuple(row[:-1]): row[-1] for row in rows}
+
+
+def shape(spans: list[Bucket], counts: dict[tuple, int]) -> list[HistogramBucket]:
+    values = [counts.get(b.key, 0) for b in spans]
+    max_count = max(values, default=0)
+    return [
+        HistogramBucket(
+            label=b.label,
+            start=b.start.isoformat(),
+            end=b.end.isoformat(),
+            sessions=c,
+            ratio=0.0 if max_count == 0 else round(c / max_count, 2),
+        )
+        for b, c in zip(spans, values)
+    ]
+
+
+async def histogram(
+    db: AsyncSession, user_id: int, granularity: str, start: date, end: date,
+) -> list[HistogramBucket]:
+    if (end - start).days > MAX_BUCKETS * 31:
+        raise ValueError(f"Range too large: at most {MAX_BUCKETS} buckets")
+    spans = buckets(granularity, start, end)
+    if len(spans) > MAX_BUCKETS:
+        raise ValueError(f"Range too large: at most {MAX_BUCKETS} buckets")
+    return shape(spans, await bucket_counts(db, user_id, granularity, start, end))
+
+
+def default_range(granularity: str, today: date) -> tuple[date, date]:
+    """Current week (day), month (week) or year (month) as ``[start, end)``."""
+    if granularity == "day":
+        start = today - timedelta(days=today.weekday())
+        return start, start + timedelta(days=7)
+    if granularity == "week":
+        start = today.replace(day=1)
+        return start, _next_month(start)
+    return date(today.year, 1, 1), date(today.year + 1, 1, 1)
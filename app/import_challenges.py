@@ -1,8 +1,16 @@
 import csv
+import hashlib
+import json
 import os
+import time
+from itertools import islice
+from sqlalchemy import delete, exists, insert, select
 from sqlalchemy.orm import Session
-from .database import engine, SessionLocal, Base
-from .models import Challenge, ChallengeStep
+from .database import engine, SessionLocal, Base, dialect_insert
+from .models import Challenge, ChallengeCompletion, ChallengeStep, Session as SessionRow
+from .catalog import catalog, bump_version
+
+BATCH_SIZE = 500
 
 def parse_duration(value: str) -> int:
     v = value.strip().lower()
@@ -15,53 +23,139 @@ def parse_duration(value: str) -> int:
     except Exception:
         return 5
 
-def import_csv(csv_path: str):
-    Base.metadata.create_all(bind=engine)
+def content_hash(name: str, duration_minutes: int, description: str, steps: list[str]) -> str:
+    payload = json.dumps([name, duration_minutes, description, steps], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def parse_row(row: dict) -> dict:
+    steps_raw = row.get("Steps", "").strip()
+    out = {
+        "pillar": row.get("Pillar", "").strip(),
+        "energy_level": row.get("Energy Level", "").strip().upper(),
+        "number": int(row.get("Challenge #", "0").strip() or 0),
+        "name": row.get("Challenge Name", "").strip(),
+        "duration_minutes": parse_duration(row.get("Duration", "5 minutes")),
+        "description": row.get("Description", "").strip(),
+        "steps": [s.strip() for s in steps_raw.split("|") if s.strip()],
+    }
+    out["content_hash"] = content_hash(out["name"], out["duration_minutes"], out["description"], out["steps"])
+    return out
+
+def _batches(rows, size: int):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+def upsert_batch(db: Session, rows: list[dict]) -> int:
+    """Upsert one batch of parsed rows and replace their steps; returns steps written."""
+    # ON CONFLICT cannot touch the same row twice in one statement; the last CSV row wins
+    by_key = {(r["pillar"], r["energy_level"], r["number"]): r for r in rows}
+    insert_ = dialect_insert(db)
+    stmt = insert_(Challenge).values([
+        {k: v for k, v in r.items() if k != "steps"} for r in by_key.values()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Challenge.pillar, Challenge.energy_level, Challenge.number],
+        set_={
+            "name": stmt.excluded.name,
+            "duration_minutes": stmt.excluded.duration_minutes,
+            "description": stmt.excluded.description,
+            "content_hash": stmt.excluded.content_hash,
+        },
+    ).returning(Challenge.id, Challenge.pillar, Challenge.energy_level, Challenge.number)
+    ids = {(p, e, n): cid for cid, p, e, n in db.execute(stmt)}
+
+    db.execute(delete(ChallengeStep).where(ChallengeStep.challenge_id.in_(list(ids.values()))))
+    steps = [
+        {"challenge_id": ids[key], "order": idx, "text": text}
+        for key, r in by_key.items()
+        for idx, text in enumerate(r["steps"], start=1)
+    ]
+    if steps:
+        db.execute(insert(ChallengeStep), steps)
+    return len(steps)
+
+def prune(db: Session, ids: list[int]) -> tuple[int, int]:
+    """Delete challenges by id, keeping any that sessions or completions still reference.
+
+    Sessions and completions cascade-delete with their challenge, so removing
+    a used challenge would erase user history and leave progress counters and
+    progression cycles out of sync. Returns ``(deleted, kept)``.
+    """
+    deleted = 0
+    for i in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[i:i + BATCH_SIZE]
+        deleted += db.execute(
+            delete(Challenge).where(
+                Challenge.id.in_(chunk),
+                ~exists().where(SessionRow.challenge_id == Challenge.id),
+                ~exists().where(ChallengeCompletion.challenge_id == Challenge.id),
+            )
+        ).rowcount
+    return deleted, len(ids) - deleted
+
+def import_csv(csv_path: str, batch_size: int = BATCH_SIZE, prune_missing: bool = False) -> dict:
+    """Incrementally import the catalog CSV.
+
+    Stored content hashes are read in one query; only new or changed rows are
+    written, so re-importing an unchanged file costs a single SELECT.
+    """
+    start = time.perf_counter()
+    summary = {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "removed": 0, "missing": 0, "steps": 0}
     with open(csv_path, encoding="utf-8") as f:
         reader = csv.DictReader(f)
         with SessionLocal() as db:
-            for row in reader:
-                pillar = row.get("Pillar", "").strip()
-                energy = row.get("Energy Level", "").strip().upper()
-                number = int(row.get("Challenge #", "0").strip() or 0)
-                name = row.get("Challenge Name", "").strip()
-                duration = parse_duration(row.get("Duration", "5 minutes"))
-                description = row.get("Description", "").strip()
-                steps_raw = row.get("Steps", "").strip()
-                steps = [s.strip() for s in steps_raw.split("|") if s.strip()]
-
-                existing = db.query(Challenge).filter(
-                    Challenge.pillar == pillar,
-                    Challenge.energy_level == energy,
-                    Challenge.number == number,
-                ).first()
-                if existing:
-                    db.query(ChallengeStep).filter(ChallengeStep.challenge_id == existing.id).delete()
-                    existing.name = name
-                    existing.duration_minutes = duration
-                    existing.description = description
-                    db.add(existing)
-                    db.flush()
-                    cid = existing.id
-                else:
-                    c = Challenge(
-                        pillar=pillar,
-                        energy_level=energy,
-                        number=number,
-                        name=name,
-                        duration_minutes=duration,
-                        description=description,
-                    )
-                    db.add(c)
-                    db.flush()
-                    cid = c.id
-                for idx, s in enumerate(steps, start=1):
-                    db.add(ChallengeStep(challenge_id=cid, order=idx, text=s))
-            db.commit()
+            existing = {
+                (p, e, n): (cid, h)
+                for cid, p, e, n, h in db.execute(
+                    select(Challenge.id, Challenge.pillar, Challenge.energy_level, Challenge.number, Challenge.content_hash)
+                )
+            }
+            seen = set()
+            # One transaction: readers see either the old or the new catalog
+            for batch in _batches((parse_row(r) for r in reader), batch_size):
+                pending = []
+                for r in batch:
+                    key = (r["pillar"], r["energy_level"], r["number"])
+                    seen.add(key)
+                    current = existing.get(key)
+                    if current is None:
+                        summary["inserted"] += 1
+                    elif current[1] != r["content_hash"]:
+                        summary["updated"] += 1
+                    else:
+                        summary["unchanged"] += 1
+                        continue
+                    pending.append(r)
+                summary["rows"] += len(batch)
+                if pending:
+                    summary["steps"] += upsert_batch(db, pending)
+            missing = [cid for key, (cid, _) in existing.items() if key not in seen]
+            summary["missing"] = len(missing)
+            if prune_missing and missing:
+                summary["removed"], summary["missing"] = prune(db, missing)
+            if summary["inserted"] or summary["updated"] or summary["removed"]:
+                bump_version(db)
+                db.commit()
+    if summary["inserted"] or summary["updated"] or summary["removed"]:
+        catalog.invalidate()
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["rows_per_sec"] = round(summary["rows"] / elapsed, 1) if elapsed > 0 else 0.0
+    print(
+        f"{summary['rows']} rows: {summary['inserted']} inserted, {summary['updated']} updated, "
+        f"{summary['unchanged']} unchanged, {summary['removed']} removed, "
+        f"{summary['missing']} missing from CSV"
+        f"{' and kept (still used by sessions or completions)' if prune_missing else ' (use --prune to remove)'}"
+    )
+    print(f"Wrote {summary['steps']} steps in {summary['seconds']}s, {summary['rows_per_sec']} rows/sec")
+    return summary
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) < 2:
-        print("Usage: python -m backend.app.import_challenges <csv_path>")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("Usage: python -m backend.app.import_challenges <csv_path> [batch_size] [--prune]")
         raise SystemExit(1)
-    import_csv(sys.argv[1])
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    import_csv(args[0], int(args[1]) if len(args) > 1 else BATCH_SIZE, prune_missing="--prune" in sys.argv)
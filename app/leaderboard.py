@@ -0,0 +1,82 @@
+"""
+Points leaderboards for ``/leaderboard``, served from the maintained totals.
+
+- ``all``: ``user_progress.total_points``
+- ``week``: ``user_weekly_points`` for one week (Monday start)
+
+Both tables carry a (points, user_id) index (per week for the weekly one), so
+the top-K page is a bounded index walk and a user's rank is one plus a count
+of the index range above their points; nothing sums raw sessions. Users with
+equal points share a rank. The top-K page is cached in-process for
+``LEADERBOARD_CACHE_TTL_SECONDS``; the caller's own entry is always fresh.
+"""
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .auth import AuthUser, TTLCache
+from .config import LEADERBOARD_CACHE_TTL_SECONDS
+from .models import User, UserProgress, UserWeeklyPoints
+from .rollups import load_progress
+from .schemas import LeaderboardEntry
+
+PERIODS = ("all", "week")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+_top_cache = TTLCache(256, LEADERBOARD_CACHE_TTL_SECONDS)
+
+
+def _board(period: str, week: date | None):
+    """(user id column, points column, filters) for one leaderboard."""
+    if period == "week":
+        return UserWeeklyPoints.user_id, UserWeeklyPoints.points, [UserWeeklyPoints.week_start == week]
+    return UserProgress.user_id, UserProgress.total_points, []
+
+
+def top_query(period: str, week: date | None, limit: int):
+    user_id, points, filters = _board(period, week)
+    return (
+        select(user_id, User.username, points)
+        .join(User, User.id == user_id)
+        .where(*filters, points > 0)
+        .order_by(points.desc(), user_id.desc())
+        .limit(limit)
+    )
+
+
+def rank_query(period: str, week: date | None, points_above: int):
+    """Number of users with more points than ``points_above``."""
+    user_id, points, filters = _board(period, week)
+    return select(func.count()).select_from(user_id.table).where(*filters, points > points_above)
+
+
+def _ranked(rows) -> list[LeaderboardEntry]:
+    entries = []
+    for i, (user_id, username, points) in enumerate(rows):
+        rank = entries[-1].rank if entries and entries[-1].points == points else i + 1
+        entries.append(LeaderboardEntry(rank=rank, user_id=user_id, username=username, points=points))
+    return entries
+
+
+async def top(db: AsyncSession, period: str, week: date | None, limit: int = DEFAULT_LIMIT) -> list[LeaderboardEntry]:
+    limit = min(max(limit, 1), MAX_LIMIT)
+    key = (period, week, limit)
+    entries = _top_cache.get(key)
+    if entries is None:
+        entries = _ranked((await db.execute(top_query(period, week, limit))).all())
+        _top_cache.set(key, entries)
+    return entries
+
+
+async def entry_for(db: AsyncSession, user: AuthUser, period: str, week: date | None) -> LeaderboardEntry:
+    """The user's own points and rank, read fresh."""
+    if period == "week":
+        points = await db.scalar(select(UserWeeklyPoints.points).where(
+            UserWeeklyPoints.user_id == user.id, UserWeeklyPoints.week_start == week,
+        )) or 0
+    else:
+        points = (await db.run_sync(load_progress, user.id)).total_points
+    higher = await db.scalar(rank_query(period, week, points))
+    return LeaderboardEntry(rank=higher + 1, user_id=user.id, username=user.username, points=points)
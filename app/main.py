@@ -1,23 +1,49 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session as DBSession
-from datetime import datetime, timedelta
-
-from .database import Base, engine, get_db
-from .models import User, Challenge, ChallengeStep, ChallengeCompletion
-from .models import Session
-from .schemas import UserCreate, UserOut, Token, LoginRequest, RefreshRequest, SessionCreate, SessionOut, SummaryOut
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
+
+from .database import async_engine, async_read_engine, dialect_insert, engine, get_async_db, pool_stats
+from .replica import get_read_db, mark_write, read_sessionmaker
+from .metrics import MetricsMiddleware, instrument_engine, query_budget, registry
+from .catalog import catalog
+from . import export, leaderboard, progression
+from .activity import DEFAULT_PAGE_SIZE, recent_page
+from .models import User
+from .models import Session, UserDailyStat
+from .rollups import load_progress, record_completions, record_sessions, week_start
+from .histogram import GRANULARITIES, default_range, histogram
+from .progress import (
+    CALENDAR_FORMATS,
+    DASHBOARD_SECTIONS,
+    breakdown_section,
+    calendar_days,
+    calendar_levels,
+    calendar_range,
+    dashboard_sections,
+    legacy_histogram_section,
+    parse_month,
+    summary_section,
+)
+from .responses import ORJSONResponse, json_response
+from .schemas import (
+    UserCreate, UserOut, Token, LoginRequest, RefreshRequest, SessionBatch, SessionBatchOut, SessionCreate, SessionOut,
+    SummaryOut, StatusOut, PoolStatsOut, ChallengePage, NextChallengeOut, ActivityPage, BreakdownOut, CalendarOut,
+    CalendarLevelsOut, DashboardOut, HistogramOut, LegacyHistogramOut, LeaderboardOut,
+)
 from .auth import (
-    hash_password,
-    verify_password,
+    password_pool,
     create_access_token,
     create_refresh_token,
     get_current_user,
+    get_refresh_user,
 )
 
 
-app = FastAPI(title="CorpFinity Backend", version="1.0.0")
+app = FastAPI(title="CorpFinity Backend", version="1.0.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,148 +52,154 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if async_read_engine is not None:
+    instrument_engine(async_read_engine.sync_engine)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+@app.get("/health", response_model=StatusOut)
+@query_budget(0)
+async def health():
+    return json_response(StatusOut(status="ok"))
+
+
+@app.get("/health/pool", response_model=PoolStatsOut)
+@query_budget(0)
+async def health_pool():
+    return json_response(PoolStatsOut(**pool_stats()))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+@query_budget(0)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
+async def _find_user(db: AsyncSession, email: str, username: str | None = None) -> User | None:
+    cond = User.email == email
+    if username is not None:
+        cond = cond | (User.username == username)
+    return await db.scalar(select(User).where(cond).limit(1))
+
+
+async def _save_user(db: AsyncSession, user: User) -> User:
+    # Sessions keep attributes after commit (expire_on_commit=False) and the
+    # primary key comes back from the INSERT, so no refresh round trip
+    db.add(user)
+    await db.commit()
+    return user
+
+
+# Argon2 runs on auth.password_pool so it never blocks the event loop
 @app.post("/auth/register", response_model=Token)
-def register(user_in: UserCreate, db: DBSession = Depends(get_db)):
-    existing = db.query(User).filter((User.email == user_in.email) | (User.username == user_in.username)).first()
+@query_budget(2)
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await _find_user(db, user_in.email, user_in.username)
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
     user = User(
         username=user_in.username,
         email=user_in.email,
-        hashed_password=hash_password(user_in.password),
+        hashed_password=await password_pool.hash(user_in.password),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    access = create_access_token(user.email)
-    refresh = create_refresh_token(user.email)
-    return Token(access_token=access, refresh_token=refresh)
+    user = await _save_user(db, user)
+    access = create_access_token(user.email, user.id, user.token_version)
+    refresh = create_refresh_token(user.email, user.id, user.token_version)
+    # The replica may not have the new user yet
+    return mark_write(json_response(Token(access_token=access, refresh_token=refresh)), user.id)
 
 
 @app.post("/auth/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: DBSession = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+@query_budget(2)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await _find_user(db, form_data.username)
+    if not user or not await password_pool.verify(form_data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
-    access = create_access_token(user.email)
-    refresh = create_refresh_token(user.email)
-    return Token(access_token=access, refresh_token=refresh)
+    if password_pool.needs_rehash(user.hashed_password):
+        # Cost parameters changed since this hash was made; upgrade it while we have the password
+        user.hashed_password = await password_pool.hash(form_data.password)
+        await _save_user(db, user)
+    access = create_access_token(user.email, user.id, user.token_version)
+    refresh = create_refresh_token(user.email, user.id, user.token_version)
+    return json_response(Token(access_token=access, refresh_token=refresh))
 
 
 @app.post("/auth/refresh", response_model=Token)
-def refresh(body: RefreshRequest, db: DBSession = Depends(get_db)):
-    from .auth import decode_token, create_access_token, create_refresh_token
-
-    payload = decode_token(body.token)
-    if payload.get("type") != "refresh":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
-    subject = payload.get("sub")
-    access = create_access_token(subject)
-    refresh = create_refresh_token(subject)
-    return Token(access_token=access, refresh_token=refresh)
+@query_budget(1)
+async def refresh(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await get_refresh_user(body.token, db)
+    access = create_access_token(user.email, user.id, user.token_version)
+    refresh = create_refresh_token(user.email, user.id, user.token_version)
+    return json_response(Token(access_token=access, refresh_token=refresh))
 
 
 @app.get("/auth/me", response_model=UserOut)
-def me(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    return UserOut(id=user.id, username=user.username, email=user.email)
-@app.get("/challenges")
-def list_challenges(pillar: str | None = None, energy_level: str | None = None, db: DBSession = Depends(get_db)):
-    q = db.query(Challenge)
-    if pillar:
-        q = q.filter(Challenge.pillar == pillar)
-    if energy_level:
-        q = q.filter(Challenge.energy_level == energy_level)
-    items = q.order_by(Challenge.pillar, Challenge.energy_level, Challenge.number).all()
-    out = []
-    for c in items:
-        steps = db.query(ChallengeStep).filter(ChallengeStep.challenge_id == c.id).order_by(ChallengeStep.order).all()
-        out.append({
-            "id": c.id,
-            "pillar": c.pillar,
-            "energy_level": c.energy_level,
-            "number": c.number,
-            "name": c.name,
-            "duration_minutes": c.duration_minutes,
-            "description": c.description,
-            "steps": [s.text for s in steps],
-        })
-    return {"items": out}
-
-
-@app.get("/challenges/next")
-def next_challenge(pillar: str, energy_level: str, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    challenges = db.query(Challenge).filter(
-        Challenge.pillar == pillar,
-        Challenge.energy_level == energy_level,
-    ).order_by(Challenge.number).all()
-    if not challenges:
-        return {"item": None}
-    completed_ids = {
-        c.challenge_id for c in db.query(ChallengeCompletion).filter(
-            ChallengeCompletion.user_id == user.id,
-            ChallengeCompletion.pillar == pillar,
-            ChallengeCompletion.energy_level == energy_level,
-        ).all()
-    }
-    choice = None
-    for c in challenges:
-        if c.id not in completed_ids:
-            choice = c
-            break
-    if choice is None:
-        db.query(ChallengeCompletion).filter(
-            ChallengeCompletion.user_id == user.id,
-            ChallengeCompletion.pillar == pillar,
-            ChallengeCompletion.energy_level == energy_level,
-        ).delete()
-        db.commit()
-        choice = challenges[0]
-    steps = db.query(ChallengeStep).filter(ChallengeStep.challenge_id == choice.id).order_by(ChallengeStep.order).all()
-    return {
-        "item": {
-            "id": choice.id,
-            "pillar": choice.pillar,
-            "energy_level": choice.energy_level,
-            "number": choice.number,
-            "name": choice.name,
-            "duration_minutes": choice.duration_minutes,
-            "description": choice.description,
-            "steps": [s.text for s in steps],
-        }
-    }
-
-
-@app.post("/challenges/{challenge_id}/complete")
-def complete_challenge(challenge_id: int, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    c = db.query(Challenge).filter(Challenge.id == challenge_id).first()
+@query_budget(1)
+async def me(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    return json_response(UserOut(id=user.id, username=user.username, email=user.email))
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Served from the catalog's pre-encoded pages; the model documents the body
+@app.get("/challenges", response_model=ChallengePage)
+@query_budget(3)
+async def list_challenges(request: Request, pillar: str | None = None, energy_level: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    page = await catalog.encoded(db, pillar, energy_level)
+    use_gzip = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    etag = page.gzip_etag if use_gzip else page.etag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (_etag_matches(if_none_match, page.etag) or _etag_matches(if_none_match, page.gzip_etag)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=page.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
+
+@app.get("/challenges/next", response_model=NextChallengeOut)
+@query_budget(6)
+async def next_challenge(pillar: str, energy_level: str, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    page = await catalog.list(db, pillar, energy_level)
+    item = await db.run_sync(progression.next_challenge, user.id, pillar, energy_level, page)
+    return json_response(NextChallengeOut(item=item))
+
+
+@app.post("/challenges/{challenge_id}/complete", response_model=StatusOut)
+@query_budget(15)
+async def complete_challenge(challenge_id: int, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(token, db)
+    c = await catalog.get(db, challenge_id)
     if not c:
         raise HTTPException(status_code=404, detail="Challenge not found")
-    existing = db.query(ChallengeCompletion).filter(
-        ChallengeCompletion.user_id == user.id,
-        ChallengeCompletion.challenge_id == challenge_id,
-    ).first()
-    if not existing:
-        db.add(ChallengeCompletion(
-            user_id=user.id,
-            challenge_id=challenge_id,
-            pillar=c.pillar,
-            energy_level=c.energy_level,
-        ))
-        db.commit()
-    return {"status": "ok"}
+    page = await catalog.list(db, c["pillar"], c["energy_level"])
+    if await db.run_sync(progression.record_completion, user.id, c, page):
+        await db.run_sync(record_completions, user.id, 1)
+    await db.commit()
+    return mark_write(json_response(StatusOut(status="ok")), user.id)
 
 
 def _points_for(duration_seconds: int, intensity: str | None) -> int:
@@ -185,9 +217,10 @@ def _points_for(duration_seconds: int, intensity: str | None) -> int:
 
 
 @app.post("/sessions", response_model=SessionOut)
-def create_session(body: SessionCreate, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    c = db.query(Challenge).filter(Challenge.id == body.challenge_id).first()
+@query_budget(13)
+async def create_session(body: SessionCreate, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user = await get_current_user(token, db)
+    c = await catalog.get(db, body.challenge_id)
     if not c:
         raise HTTPException(status_code=404, detail="Challenge not found")
     points = _points_for(body.duration_seconds, body.intensity)
@@ -195,9 +228,9 @@ def create_session(body: SessionCreate, token: str = Depends(oauth2_scheme), db:
     ended = body.ended_at or datetime.utcnow()
     s = Session(
         user_id=user.id,
-        challenge_id=c.id,
-        pillar=c.pillar,
-        energy_level=c.energy_level,
+        challenge_id=c["id"],
+        pillar=c["pillar"],
+        energy_level=c["energy_level"],
         started_at=started,
         ended_at=ended,
         duration_seconds=body.duration_seconds,
@@ -205,204 +238,274 @@ def create_session(body: SessionCreate, token: str = Depends(oauth2_scheme), db:
         points=points,
     )
     db.add(s)
-    db.commit()
-    db.refresh(s)
-    return SessionOut(
-        id=s.id,
-        challenge_id=s.challenge_id,
-        pillar=s.pillar,
-        energy_level=s.energy_level,
-        started_at=s.started_at,
-        ended_at=s.ended_at,
-        duration_seconds=s.duration_seconds,
-        intensity=s.intensity,
-        points=s.points,
-    )
-
-
-@app.get("/activity/recent")
-def recent_activity(limit: int = 20, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    items = db.query(Session).filter(Session.user_id == user.id).order_by(Session.started_at.desc()).limit(limit).all()
-    out = []
-    for s in items:
-        out.append({
-            "id": s.id,
-            "challenge_id": s.challenge_id,
-            "title": db.query(Challenge).filter(Challenge.id == s.challenge_id).first().name,
-            "started_at": s.started_at,
-            "duration_minutes": s.duration_seconds // 60,
-            "intensity": s.intensity,
-            "points": s.points,
+    await db.flush()
+    await db.run_sync(record_sessions, [s])
+    await db.commit()
+    # expire_on_commit=False and every column was set explicitly, so no refresh round trip
+    return mark_write(json_response(SessionOut.model_validate(s, from_attributes=True)), user.id)
+
+
+@app.post("/sessions/batch", response_model=list[SessionBatchOut])
+@query_budget(14)
+async def create_sessions_batch(body: SessionBatch, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Offline sync: insert many sessions in one statement.
+
+    Items whose ``idempotency_key`` is already stored for the user are not
+    inserted again; the stored session is returned instead. Returns the
+    sessions ordered by id.
+    """
+    user = await get_current_user(token, db)
+    challenges = await catalog.get_many(db, (item.challenge_id for item in body.sessions))
+    unknown = sorted({item.challenge_id for item in body.sessions} - challenges.keys())
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Challenges not found: {unknown}")
+
+    columns = Session.__table__.c
+    keys = {item.idempotency_key for item in body.sessions if item.idempotency_key}
+    replayed = []
+    if keys:
+        replayed = (await db.execute(select(columns).where(
+            Session.user_id == user.id, Session.idempotency_key.in_(keys),
+        ))).all()
+    seen = {r.idempotency_key for r in replayed}
+    now = datetime.utcnow()
+    values = []
+    for item in body.sessions:
+        if item.idempotency_key:
+            if item.idempotency_key in seen:
+                continue
+            seen.add(item.idempotency_key)
+        c = challenges[item.challenge_id]
+        values.append({
+            "user_id": user.id,
+            "challenge_id": c["id"],
+            "pillar": c["pillar"],
+            "energy_level": c["energy_level"],
+            "started_at": item.started_at or now,
+            "ended_at": item.ended_at or now,
+            "duration_seconds": item.duration_seconds,
+            "intensity": (item.intensity or "MEDIUM").upper(),
+            "points": _points_for(item.duration_seconds, item.intensity),
+            "idempotency_key": item.idempotency_key,
         })
-    return {"items": out}
+
+    created = []
+    if values:
+        insert = dialect_insert(db)
+        # A concurrent retry of the same keys loses the race here and is skipped
+        created = (await db.execute(
+            insert(Session).values(values)
+            .on_conflict_do_nothing(index_elements=[Session.user_id, Session.idempotency_key])
+            .returning(*columns)
+        )).all()
+        await db.run_sync(record_sessions, created)
+        await db.commit()
+        if len(created) < len(values):
+            raced = {v["idempotency_key"] for v in values if v["idempotency_key"]} - {r.idempotency_key for r in created}
+            replayed += (await db.execute(select(columns).where(
+                Session.user_id == user.id, Session.idempotency_key.in_(raced),
+            ))).all()
+    rows = sorted([*replayed, *created], key=lambda r: r.id)
+    response = json_response([SessionBatchOut.model_validate(r, from_attributes=True) for r in rows], list[SessionBatchOut])
+    return mark_write(response, user.id) if created else response
+
+
+@app.get("/activity/recent", response_model=ActivityPage)
+@query_budget(2)
+async def recent_activity(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Newest sessions first; pass ``next_cursor`` back as ``cursor`` for older pages."""
+    user = await get_current_user(token, db)
+    try:
+        items, next_cursor = await recent_page(db, user.id, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return json_response(ActivityPage(items=items, next_cursor=next_cursor))
 
 
 @app.get("/progress/summary", response_model=SummaryOut)
-def progress_summary(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    completed_count = db.query(ChallengeCompletion).filter(ChallengeCompletion.user_id == user.id).count()
-    sessions = db.query(Session).filter(Session.user_id == user.id).all()
-    total_minutes = sum(s.duration_seconds for s in sessions) // 60
-    points = sum(s.points for s in sessions)
-    dates = sorted({s.started_at.date() for s in sessions}, reverse=True)
-    streak = 0
-    if dates:
-        cur = datetime.utcnow().date()
-        seen = set(dates)
-        while cur in seen:
-            streak += 1
-            cur = cur.fromordinal(cur.toordinal() - 1)
-    return SummaryOut(completed_count=completed_count, total_minutes=total_minutes, streak_days=streak, points=points)
-
-
-@app.get("/progress/breakdown")
-def progress_breakdown(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    by_pillar = {}
-    sessions = db.query(Session).filter(Session.user_id == user.id).all()
-    total_min = 0
-    for s in sessions:
-        m = s.duration_seconds // 60
-        total_min += m
-        p = s.pillar
-        if p not in by_pillar:
-            by_pillar[p] = {"sessions": 0, "minutes": 0}
-        by_pillar[p]["sessions"] += 1
-        by_pillar[p]["minutes"] += m
-    items = []
-    for pillar, agg in by_pillar.items():
-        minutes = agg["minutes"]
-        percentage = 0
-        if total_min > 0:
-            percentage = int((minutes * 100) / total_min)
-        items.append({
-            "pillar": pillar,
-            "sessions": agg["sessions"],
-            "minutes": minutes,
-            "percentage": percentage,
-        })
-    return {"items": items}
-
-
-@app.get("/progress/calendar")
-def progress_calendar(month: str | None = None, token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    if month:
-        try:
-            year, mon = [int(x) for x in month.split("-")]
-        except Exception:
-            year, mon = datetime.utcnow().year, datetime.utcnow().month
-    else:
-        year, mon = datetime.utcnow().year, datetime.utcnow().month
-    items = {}
-    sessions = db.query(Session).filter(Session.user_id == user.id).all()
-    for s in sessions:
-        dt = s.started_at
-        if dt.year == year and dt.month == mon:
-            key = dt.day
-            items[key] = items.get(key, 0) + (s.duration_seconds // 60)
-    out = []
-    for day in range(1, 32):
-        try:
-            d = datetime(year, mon, day)
-        except ValueError:
-            break
-        mins = items.get(day, 0)
-        activity = 0
-        if mins > 0 and mins < 20:
-            activity = 1
-        elif mins >= 20:
-            activity = 2
-        out.append({"date": d.date().isoformat(), "activity": activity})
-    return {"items": out}
-
-
-@app.get("/progress/weekly")
-def progress_weekly(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    today = datetime.utcnow().date()
-    start = today - timedelta(days=today.weekday())
-    counts = {}
-    max_count = 0
-    for i in range(7):
-        d = start + timedelta(days=i)
-        c = db.query(Session).filter(Session.user_id == user.id, Session.started_at >= datetime(d.year, d.month, d.day), Session.started_at < datetime(d.year, d.month, d.day) + timedelta(days=1)).count()
-        counts[d] = c
-        if c > max_count:
-            max_count = c
-    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-    items = []
-    for i in range(7):
-        d = start + timedelta(days=i)
-        c = counts.get(d, 0)
-        ratio = 0.0 if max_count == 0 else round(c / max_count, 2)
-        items.append({"day": days[i], "sessions": c, "ratio": ratio})
-    return {"items": items}
-
-
-@app.get("/progress/monthly")
-def progress_monthly(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
+@query_budget(5)
+async def progress_summary(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    return json_response(summary_section(await db.run_sync(load_progress, user.id)))
+
+
+@app.get("/progress/breakdown", response_model=BreakdownOut)
+@query_budget(2)
+async def progress_breakdown(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    rows = (await db.execute(
+        select(
+            UserDailyStat.pillar,
+            func.sum(UserDailyStat.sessions),
+            func.sum(UserDailyStat.minutes),
+        ).where(UserDailyStat.user_id == user.id).group_by(UserDailyStat.pillar).order_by(UserDailyStat.pillar)
+    )).all()
+    return json_response(breakdown_section(rows))
+
+
+@app.get("/progress/calendar", response_model=CalendarOut | CalendarLevelsOut)
+@query_budget(2)
+async def progress_calendar(
+    month: str | None = None,
+    from_: date | None = Query(None, alias="from"),
+    to: date | None = None,
+    fmt: str = Query("days", alias="format"),
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Per-day activity levels for ``month`` or a ``from``/``to`` range of up to a year.
+
+    ``format=levels`` returns one digit per day in a single string (a year
+    heatmap in a few hundred bytes) instead of one object per day.
+    """
+    user = await get_current_user(token, db)
+    if fmt not in CALENDAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(CALENDAR_FORMATS)}")
+    try:
+        start, end = calendar_range(from_, to, month, datetime.utcnow().date())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    day_minutes = {
+        d: mins for d, mins in await db.execute(
+            select(UserDailyStat.day, func.sum(UserDailyStat.minutes)).where(
+                UserDailyStat.user_id == user.id,
+                UserDailyStat.day >= start,
+                UserDailyStat.day < end,
+            ).group_by(UserDailyStat.day)
+        )
+    }
+    if fmt == "levels":
+        return json_response(calendar_levels(day_minutes, start, end))
+    return json_response(calendar_days(day_minutes, start, end))
+
+
+@app.get("/progress/dashboard", response_model=DashboardOut, response_model_exclude_unset=True)
+@query_budget(7)
+async def progress_dashboard(
+    sections: str | None = None,
+    month: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Home-screen widgets in one round trip; ``sections`` is a comma-separated subset."""
+    user = await get_current_user(token, db)
+    wanted = set(DASHBOARD_SECTIONS)
+    if sections:
+        wanted = {s.strip() for s in sections.split(",") if s.strip()}
+        unknown = wanted - set(DASHBOARD_SECTIONS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(sorted(unknown))}")
     today = datetime.utcnow().date()
-    year, mon = today.year, today.month
-    days_in_month = 0
-    for day in range(1, 32):
-        try:
-            datetime(year, mon, day)
-            days_in_month = day
-        except ValueError:
-            break
-    chunks = (days_in_month + 6) // 7
-    items = []
-    max_count = 0
-    counts = []
-    for i in range(chunks):
-        start_day = 1 + i * 7
-        start_dt = datetime(year, mon, start_day)
-        if i == chunks - 1:
-            end_dt = datetime(year, mon, days_in_month) + timedelta(days=1)
-        else:
-            end_dt = start_dt + timedelta(days=7)
-        c = db.query(Session).filter(
-            Session.user_id == user.id,
-            Session.started_at >= start_dt,
-            Session.started_at < end_dt,
-        ).count()
-        counts.append(c)
-        if c > max_count:
-            max_count = c
-    for i in range(chunks):
-        c = counts[i]
-        ratio = 0.0 if max_count == 0 else round(c / max_count, 2)
-        items.append({"day": f"W{i+1}", "sessions": c, "ratio": ratio})
-    return {"items": items}
-
-
-@app.get("/progress/yearly")
-def progress_yearly(token: str = Depends(oauth2_scheme), db: DBSession = Depends(get_db)):
-    user = get_current_user(token, db)
-    year = datetime.utcnow().year
-    items = []
-    max_count = 0
-    counts = []
-    for m in range(1, 13):
-        start_dt = datetime(year, m, 1)
-        next_month = (start_dt.replace(day=28) + timedelta(days=4)).replace(day=1)
-        end_dt = next_month
-        c = db.query(Session).filter(
-            Session.user_id == user.id,
-            Session.started_at >= start_dt,
-            Session.started_at < end_dt,
-        ).count()
-        counts.append(c)
-        if c > max_count:
-            max_count = c
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-    for i in range(12):
-        c = counts[i]
-        ratio = 0.0 if max_count == 0 else round(c / max_count, 2)
-        items.append({"day": months[i], "sessions": c, "ratio": ratio})
-    return {"items": items}
-
-
+    year, mon = parse_month(month, today)
+    out = await dashboard_sections(db, user.id, wanted, year, mon, today)
+    if "recent" in wanted:
+        items, next_cursor = await recent_page(db, user.id, limit)
+        out["recent"] = ActivityPage(items=items, next_cursor=next_cursor)
+    return json_response(DashboardOut(**out), exclude_unset=True)
+
+
+async def _histogram_view(db: AsyncSession, user_id: int, granularity: str) -> LegacyHistogramOut:
+    start, end = default_range(granularity, datetime.utcnow().date())
+    return legacy_histogram_section(await histogram(db, user_id, granularity, start, end))
+
+
+@app.get("/progress/weekly", response_model=LegacyHistogramOut)
+@query_budget(2)
+async def progress_weekly(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    return json_response(await _histogram_view(db, user.id, "day"))
+
+
+@app.get("/progress/monthly", response_model=LegacyHistogramOut)
+@query_budget(2)
+async def progress_monthly(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    return json_response(await _histogram_view(db, user.id, "week"))
+
+
+@app.get("/progress/yearly", response_model=LegacyHistogramOut)
+@query_budget(2)
+async def progress_yearly(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_db)):
+    user = await get_current_user(token, db)
+    return json_response(await _histogram_view(db, user.id, "month"))
+
+
+@app.get("/progress/histogram", response_model=HistogramOut)
+@query_budget(2)
+async def progress_histogram(
+    granularity: str = "day",
+    from_: date | None = Query(None, alias="from"),
+    to: date | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    user = await get_current_user(token, db)
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    start, end = default_range(granularity, datetime.utcnow().date())
+    if from_:
+        start = from_
+    if to:
+        end = to + timedelta(days=1)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    try:
+        items = await histogram(db, user.id, granularity, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(HistogramOut(granularity=granularity, items=items))
+
+
+@app.get("/leaderboard", response_model=LeaderboardOut)
+@query_budget(7)
+async def get_leaderboard(
+    period: str = "all",
+    week: date | None = None,
+    limit: int = leaderboard.DEFAULT_LIMIT,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Top users by points, plus the caller's own rank; ``week`` is any day of the week wanted."""
+    user = await get_current_user(token, db)
+    if period not in leaderboard.PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(leaderboard.PERIODS)}")
+    week = week_start(week or datetime.utcnow().date()) if period == "week" else None
+    me = await leaderboard.entry_for(db, user, period, week)
+    items = await leaderboard.top(db, period, week, limit)
+    return json_response(LeaderboardOut(
+        period=period, week_start=week.isoformat() if week else None, items=items, me=me,
+    ))
+
+
+@app.get("/export/sessions", response_class=StreamingResponse)
+@query_budget(2)
+async def export_sessions(
+    request: Request,
+    fmt: str = Query("ndjson", alias="format"),
+    from_: date | None = Query(None, alias="from"),
+    to: date | None = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The caller's full session history (or ``from``/``to``, inclusive) as NDJSON or CSV.
+
+    Streamed from a server-side cursor, oldest first; gzip-compressed when the
+    client accepts it.
+    """
+    user = await get_current_user(token, db)
+    if fmt not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.FORMATS)}")
+    if from_ and to and to < from_:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    use_gzip = _accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {"Content-Disposition": f'attachment; filename="sessions.{fmt}"', "Vary": "Accept-Encoding"}
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+    body = export.stream(read_sessionmaker(request), user.id, fmt, from_, to, compress=use_gzip)
+    return StreamingResponse(body, media_type=export.FORMATS[fmt], headers=headers)
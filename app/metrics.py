@@ -0,0 +1,267 @@
+"""
+Per-route request metrics, exposed in Prometheus text format at ``/metrics``.
+
+``MetricsMiddleware`` opens a ``RequestStats`` for every HTTP request (held in
+a contextvar, so it follows the request into SQLAlchemy's greenlets) and
+folds it into the registry when the response finishes:
+
+- ``http_request_duration_seconds``: latency histogram per method and route
+- ``http_requests_total``: count per method, route and status
+- ``db_statements_total`` / ``db_seconds_total``: SQL issued and time spent
+  waiting on it, via engine cursor-execute hooks
+- ``argon2_seconds_total`` / ``jwt_seconds_total``: password hashing and token
+  encode/decode time, recorded with ``timed()``
+
+Routes are labelled by their path template (``/challenges/{challenge_id}/complete``),
+so label cardinality stays bounded. Metrics live in process memory; on
+serverless each instance reports its own. With ``SLOW_REQUEST_MS`` set,
+slower requests are logged with their statements.
+
+Routes declare how many statements a request may issue with
+``@query_budget(n)``. With ``QUERY_BUDGET_MODE=raise`` (the default when
+``APP_ENV=test``) the statement that exceeds the budget raises
+``QueryBudgetExceeded``; with ``log`` (``APP_ENV=development``) the request is
+logged with its statements once it finishes.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import QUERY_BUDGET_MODE, SLOW_REQUEST_MS
+
+logger = logging.getLogger("app.metrics")
+
+# Seconds; Prometheus' default buckets trimmed to what an API request can take
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIMERS = ("argon2", "jwt")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(statements: int):
+    """Declare the most SQL statements one request to the decorated route may issue."""
+    def decorate(endpoint):
+        endpoint.query_budget = statements
+        return endpoint
+    return decorate
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    timers: dict = field(default_factory=dict)
+    # Only collected when the slow-request log or budget checks are on
+    statement_log: list | None = None
+    # ASGI scope, kept while budget checks are on to find the matched route
+    scope: dict | None = None
+
+    def budget(self) -> int | None:
+        route = self.scope.get("route") if self.scope is not None else None
+        return getattr(getattr(route, "endpoint", None), "query_budget", None)
+
+
+def _budget_report(stats: RequestStats, budget: int, extra: str | None = None) -> str:
+    statements = stats.statement_log + ([extra] if extra else [])
+    return f"{len(statements)} statements, budget {budget}:" + "".join(f"\n  {s}" for s in statements)
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Add the block's wall time to the current request's ``name`` timer."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timers[name] = stats.timers.get(name, 0.0) + time.perf_counter() - start
+
+
+class _RouteMetrics:
+    __slots__ = ("buckets", "count", "sum", "statuses", "statements", "db_seconds", "timers")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.statuses: dict[int, int] = {}
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.timers = dict.fromkeys(TIMERS, 0.0)
+
+
+class Registry:
+    def __init__(self):
+        self._routes: dict[tuple[str, str], _RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            m = self._routes.get((method, route))
+            if m is None:
+                m = self._routes[(method, route)] = _RouteMetrics()
+            idx = bisect.bisect_left(BUCKETS, seconds)
+            if idx < len(BUCKETS):
+                m.buckets[idx] += 1
+            m.count += 1
+            m.sum += seconds
+            m.statuses[status] = m.statuses.get(status, 0) + 1
+            m.statements += stats.statements
+            m.db_seconds += stats.db_seconds
+            for name, value in stats.timers.items():
+                m.timers[name] = m.timers.get(name, 0.0) + value
+
+    def snapshot(self) -> dict[tuple[str, str], dict]:
+        """Plain-dict copy of the per-route counters."""
+        with self._lock:
+            return {
+                key: {"count": m.count, "statements": m.statements, "db_seconds": m.db_seconds,
+                      "statuses": dict(m.statuses)}
+                for key, m in self._routes.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), m in routes:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, m.buckets):
+                    cumulative += n
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {m.sum:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {m.count}")
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route), m in routes:
+                for status, n in sorted(m.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+            counters = [
+                ("db_statements_total", "SQL statements executed by route.", lambda m: m.statements, "{}"),
+                ("db_seconds_total", "Time spent executing SQL by route.", lambda m: m.db_seconds, "{:.6f}"),
+            ] + [
+                (f"{name}_seconds_total", f"Time spent in {name} by route.", lambda m, name=name: m.timers[name], "{:.6f}")
+                for name in TIMERS
+            ]
+            for metric, help_text, value, fmt in counters:
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for (method, route), m in routes:
+                    lines.append(f'{metric}{{method="{method}",route="{route}"}} {fmt.format(value(m))}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    if stats.scope is not None and QUERY_BUDGET_MODE == "raise":
+        budget = stats.budget()
+        if budget is not None and stats.statements >= budget:
+            raise QueryBudgetExceeded(_budget_report(stats, budget, statement))
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info["query_start"].pop()
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - started
+    if stats.statement_log is not None:
+        stats.statement_log.append(statement)
+
+
+def _handle_error(context):
+    # after_cursor_execute does not fire for failed statements
+    conn = context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach statement counting/timing hooks (pass ``async_engine.sync_engine`` for async engines)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering)."""
+
+    def __init__(self, app, registry: Registry = registry, slow_request_ms: float = SLOW_REQUEST_MS,
+                 budget_mode: str = QUERY_BUDGET_MODE):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = slow_request_ms
+        self.check_budgets = budget_mode in ("raise", "log")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(
+            statement_log=[] if self.slow_request_ms > 0 or self.check_budgets else None,
+            scope=scope if self.check_budgets else None,
+        )
+        token = _current.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            # FastAPI's router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            self.registry.observe(scope["method"], path, status, elapsed, stats)
+            if self.check_budgets:
+                budget = stats.budget()
+                if budget is not None and stats.statements > budget:
+                    logger.warning("query budget exceeded on %s %s: %s", scope["method"], path,
+                                   _budget_report(stats, budget))
+            if self.slow_request_ms > 0 and elapsed * 1000 >= self.slow_request_ms:
+                logger.warning(
+                    "slow request %s %s %d in %.1fms: %d statements, %.1fms db%s",
+                    scope["method"], path, status, elapsed * 1000, stats.statements, stats.db_seconds * 1000,
+                    "".join(f"\n  {s}" for s in stats.statement_log),
+                )
@@ -0,0 +1,131 @@
+"""
+Versioned schema migrations for changes ``create_all`` cannot make to
+existing tables (new columns, new or dropped indexes).
+
+``init_db.py`` runs ``create_all`` first, so a fresh database already has the
+current schema; every step is therefore idempotent (``IF [NOT] EXISTS`` or
+``checkfirst``) and simply records its version there. Each migration runs in
+its own transaction together with its ``schema_migrations`` row.
+
+    python -m app.migrations          # apply pending migrations
+    python -m app.migrations status   # list applied / pending versions
+"""
+from typing import Callable, NamedTuple, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .models import ChallengeCompletion, SchemaMigration, Session, UserProgress, UserWeeklyPoints
+
+Step = Union[str, Callable[[Connection], None]]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    steps: list[Step]
+    postgres_only: bool = False
+
+
+def _create_index(index) -> Callable[[Connection], None]:
+    """Build a model-declared index with the dialect's own DDL (e.g. INCLUDE on Postgres)."""
+    return lambda conn: index.create(bind=conn, checkfirst=True)
+
+
+def _by_dialect(postgresql: str | None, other: str | None) -> Callable[[Connection], None]:
+    """Run ``postgresql`` on Postgres and ``other`` elsewhere (either may be None)."""
+    def step(conn: Connection) -> None:
+        stmt = postgresql if conn.dialect.name == "postgresql" else other
+        if stmt:
+            conn.execute(text(stmt))
+    return step
+
+
+def _index(model, name: str):
+    return next(ix for ix in model.__table__.indexes if ix.name == name)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "users.token_version", [
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0",
+    ], postgres_only=True),
+    Migration(2, "challenges.content_hash", [
+        "ALTER TABLE challenges ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    ], postgres_only=True),
+    Migration(3, "composite indexes for session and completion lookups", [
+        _create_index(_index(Session, "ix_sessions_user_started")),
+        # Literal DDL: the model has since replaced this index (migration 5)
+        _by_dialect(
+            "CREATE INDEX IF NOT EXISTS ix_completions_user_pillar_energy "
+            "ON challenge_completions (user_id, pillar, energy_level) INCLUDE (challenge_id)",
+            "CREATE INDEX IF NOT EXISTS ix_completions_user_pillar_energy "
+            "ON challenge_completions (user_id, pillar, energy_level)",
+        ),
+        # Covered by the composite indexes' leading columns, or never queried
+        "DROP INDEX IF EXISTS ix_sessions_user_id",
+        "DROP INDEX IF EXISTS ix_sessions_pillar",
+        "DROP INDEX IF EXISTS ix_sessions_energy_level",
+        "DROP INDEX IF EXISTS ix_challenge_completions_user_id",
+        "DROP INDEX IF EXISTS ix_challenge_completions_pillar",
+        "DROP INDEX IF EXISTS ix_challenge_completions_energy_level",
+    ]),
+    Migration(4, "challenge_completions.cycle", [
+        "ALTER TABLE challenge_completions ADD COLUMN IF NOT EXISTS cycle INTEGER NOT NULL DEFAULT 0",
+    ], postgres_only=True),
+    Migration(5, "completion history per cycle", [
+        _create_index(_index(ChallengeCompletion, "uq_completions_user_challenge_cycle")),
+        _create_index(_index(ChallengeCompletion, "ix_completions_user_group_cycle")),
+        # Completions were unique per (user, challenge) before cycles kept history
+        _by_dialect("ALTER TABLE challenge_completions DROP CONSTRAINT IF EXISTS uq_completion_user_challenge", None),
+        "DROP INDEX IF EXISTS ix_completions_user_pillar_energy",
+    ]),
+    Migration(6, "sessions.idempotency_key", [
+        _by_dialect("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(64)", None),
+        _create_index(_index(Session, "uq_sessions_user_idempotency_key")),
+    ]),
+    # create_all adds user_weekly_points; fill it with ``python -m app.rollups backfill``
+    Migration(7, "leaderboard indexes", [
+        _create_index(_index(UserProgress, "ix_user_progress_points")),
+        _create_index(_index(UserWeeklyPoints, "ix_user_weekly_points_rank")),
+    ]),
+]
+
+
+def applied_versions(engine: Engine) -> set[int]:
+    SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    with engine.connect() as conn:
+        return set(conn.scalars(select(SchemaMigration.version)))
+
+
+def upgrade(engine: Engine) -> list[Migration]:
+    """Apply pending migrations in version order; returns the ones applied."""
+    done = applied_versions(engine)
+    applied = []
+    for m in sorted(MIGRATIONS, key=lambda m: m.version):
+        if m.version in done:
+            continue
+        with engine.begin() as conn:
+            if not m.postgres_only or conn.dialect.name == "postgresql":
+                for step in m.steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(text(step))
+            conn.execute(SchemaMigration.__table__.insert().values(version=m.version, description=m.description))
+        applied.append(m)
+    return applied
+
+
+if __name__ == "__main__":
+    import sys
+
+    from .database import Base, engine
+
+    if sys.argv[1:] == ["status"]:
+        done = applied_versions(engine)
+        for m in MIGRATIONS:
+            print(f"{m.version:>4}  {'applied' if m.version in done else 'pending'}  {m.description}")
+    else:
+        Base.metadata.create_all(bind=engine)
+        for m in upgrade(engine):
+            print(f"Applied migration {m.version}: {m.description}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, UniqueConstraint, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, func, Index, UniqueConstraint, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .database import Base
 
@@ -14,6 +14,8 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Bumped to revoke all issued tokens (password change, deletion)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
 
@@ -30,9 +32,13 @@ class Challenge(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     duration_minutes: Mapped[int] = mapped_column(Integer, nullable=False)
     description: Mapped[str] = mapped_column(String(1024), nullable=False)
+    # sha256 of name, duration, description and steps; lets the importer skip unchanged rows
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
-    steps: Mapped[list["ChallengeStep"]] = relationship("ChallengeStep", back_populates="challenge", cascade="all, delete-orphan")
+    steps: Mapped[list["ChallengeStep"]] = relationship(
+        "ChallengeStep", back_populates="challenge", cascade="all, delete-orphan", order_by="ChallengeStep.order"
+    )
 
 
 class ChallengeStep(Base):
@@ -46,30 +52,120 @@ class ChallengeStep(Base):
     challenge: Mapped[Challenge] = relationship("Challenge", back_populates="steps")
 
 
+class CatalogState(Base):
+    """Single-row version stamp for the challenge catalog, bumped on every import."""
+    __tablename__ = "catalog_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class ChallengeCompletion(Base):
     __tablename__ = "challenge_completions"
     __table_args__ = (
-        UniqueConstraint("user_id", "challenge_id", name="uq_completion_user_challenge"),
+        # History is kept across cycles; a challenge completes at most once per cycle
+        Index("uq_completions_user_challenge_cycle", "user_id", "challenge_id", "cycle", unique=True),
+        # Cursor advance: completed challenge ids for one (user, pillar, energy level, cycle)
+        Index(
+            "ix_completions_user_group_cycle", "user_id", "pillar", "energy_level", "cycle",
+            postgresql_include=["challenge_id"],
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     challenge_id: Mapped[int] = mapped_column(Integer, ForeignKey("challenges.id", ondelete="CASCADE"), nullable=False, index=True)
-    pillar: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
-    energy_level: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    pillar: Mapped[str] = mapped_column(String(100), nullable=False)
+    energy_level: Mapped[str] = mapped_column(String(20), nullable=False)
+    cycle: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
 
 
+class ChallengeCursor(Base):
+    """Per-user position in one (pillar, energy level) challenge sequence (see app/progression.py)."""
+    __tablename__ = "challenge_cursors"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    pillar: Mapped[str] = mapped_column(String(100), primary_key=True)
+    energy_level: Mapped[str] = mapped_column(String(20), primary_key=True)
+    next_number: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    cycle: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Recent activity pages and streak walks: one user's sessions by (started_at, id);
+        # on Postgres the included columns make the activity page an index-only scan
+        Index(
+            "ix_sessions_user_started", "user_id", "started_at", "id",
+            postgresql_include=["challenge_id", "duration_seconds", "points", "intensity"],
+        ),
+        # Batch sync retries; NULL keys never conflict
+        Index("uq_sessions_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     challenge_id: Mapped[int] = mapped_column(Integer, ForeignKey("challenges.id", ondelete="CASCADE"), index=True)
-    pillar: Mapped[str] = mapped_column(String(100), nullable=False, index=True)
-    energy_level: Mapped[str] = mapped_column(String(20), nullable=False, index=True)
+    pillar: Mapped[str] = mapped_column(String(100), nullable=False)
+    energy_level: Mapped[str] = mapped_column(String(20), nullable=False)
     started_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
     ended_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
     duration_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
     intensity: Mapped[str] = mapped_column(String(20), nullable=False, default="MEDIUM")
-    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
\ No newline at end of file
+    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    idempotency_key: Mapped[str | None] = mapped_column(String(64), nullable=True)
+
+class UserDailyStat(Base):
+    """Per-user, per-day, per-pillar session rollup maintained by create_session."""
+    __tablename__ = "user_daily_stats"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[Date] = mapped_column(Date, primary_key=True)
+    pillar: Mapped[str] = mapped_column(String(100), primary_key=True)
+    sessions: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class UserProgress(Base):
+    """Per-user running totals and streak, maintained incrementally by the write endpoints."""
+    __tablename__ = "user_progress"
+    __table_args__ = (
+        # Leaderboard: top-K walks this backwards; a rank counts the index range above a total
+        Index("ix_user_progress_points", "total_points", "user_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    streak_days: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_active_day: Mapped[Date | None] = mapped_column(Date, nullable=True)
+    total_seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class UserWeeklyPoints(Base):
+    """Per-user points per week (weeks start on Monday), maintained by the session write endpoints."""
+    __tablename__ = "user_weekly_points"
+    __table_args__ = (
+        # Weekly leaderboard: same shape as ix_user_progress_points, within one week
+        Index("ix_user_weekly_points_rank", "week_start", "points", "user_id"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    week_start: Mapped[Date] = mapped_column(Date, primary_key=True)
+    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class SchemaMigration(Base):
+    """One row per applied migration in ``app.migrations``."""
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    description: Mapped[str] = mapped_column(String(255), nullable=False)
+    applied_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,178 @@
+"""
+Progress section builders shared by the individual /progress endpoints and
+the batched /progress/dashboard endpoint.
+
+Builders are pure functions over already-fetched aggregates, so a caller can
+run one query and derive several sections from it.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .histogram import buckets, default_range, shape
+from .models import UserDailyStat, UserProgress
+from .rollups import current_streak, load_progress
+from .schemas import (
+    BreakdownItem,
+    BreakdownOut,
+    CalendarDay,
+    CalendarLevelsOut,
+    CalendarOut,
+    HistogramBucket,
+    LegacyHistogramBar,
+    LegacyHistogramOut,
+    SummaryOut,
+)
+
+DASHBOARD_SECTIONS = ("summary", "breakdown", "calendar", "weekly", "recent")
+CALENDAR_FORMATS = ("days", "levels")
+# A year heatmap, leap years included
+CALENDAR_MAX_DAYS = 366
+
+
+def parse_month(month: str | None, today: date) -> tuple[int, int]:
+    if month:
+        try:
+            year, mon = [int(x) for x in month.split("-")]
+            date(year, mon, 1)
+            return year, mon
+        except Exception:
+            pass
+    return today.year, today.month
+
+
+def month_range(year: int, mon: int) -> tuple[date, date]:
+    first = date(year, mon, 1)
+    return first, (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def summary_section(prog: UserProgress) -> SummaryOut:
+    return SummaryOut(
+        completed_count=prog.completed_count,
+        total_minutes=prog.total_seconds // 60,
+        streak_days=current_streak(prog),
+        points=prog.total_points,
+    )
+
+
+def breakdown_section(per_pillar: Iterable[tuple[str, int, int]]) -> BreakdownOut:
+    """``per_pillar`` yields ``(pillar, sessions, minutes)``."""
+    per_pillar = list(per_pillar)
+    total_min = sum(minutes for _, _, minutes in per_pillar)
+    items = []
+    for pillar, sessions, minutes in per_pillar:
+        percentage = 0
+        if total_min > 0:
+            percentage = int((minutes * 100) / total_min)
+        items.append(BreakdownItem(pillar=pillar, sessions=sessions, minutes=minutes, percentage=percentage))
+    return BreakdownOut(items=items)
+
+
+def calendar_range(start: date | None, end: date | None, month: str | None, today: date) -> tuple[date, date]:
+    """``[start, end)`` for /progress/calendar: ``from``/``to`` (inclusive) if given, else ``month``.
+
+    A missing ``to`` means today and a missing ``from`` a year before ``to``.
+    Raises ``ValueError`` for reversed or over-long ranges.
+    """
+    if start is None and end is None:
+        return month_range(*parse_month(month, today))
+    end = (end or today) + timedelta(days=1)
+    start = start or end - timedelta(days=365)
+    if end <= start:
+        raise ValueError("'to' must not be before 'from'")
+    if (end - start).days > CALENDAR_MAX_DAYS:
+        raise ValueError(f"range must not exceed {CALENDAR_MAX_DAYS} days")
+    return start, end
+
+
+def activity_level(minutes: int) -> int:
+    if minutes >= 20:
+        return 2
+    return 1 if minutes > 0 else 0
+
+
+def _days(start: date, end: date) -> Iterable[date]:
+    return (start + timedelta(days=i) for i in range((end - start).days))
+
+
+def calendar_days(day_minutes: dict[date, int], start: date, end: date) -> CalendarOut:
+    return CalendarOut(items=[
+        CalendarDay(date=d.isoformat(), activity=activity_level(day_minutes.get(d, 0))) for d in _days(start, end)
+    ])
+
+
+def calendar_levels(day_minutes: dict[date, int], start: date, end: date) -> CalendarLevelsOut:
+    """Compact heatmap: a year is one ~370-character string instead of 365 objects."""
+    return CalendarLevelsOut(
+        start=start.isoformat(),
+        end=(end - timedelta(days=1)).isoformat(),
+        levels="".join(str(activity_level(day_minutes.get(d, 0))) for d in _days(start, end)),
+    )
+
+
+def calendar_section(day_minutes: dict[date, int], year: int, mon: int) -> CalendarOut:
+    return calendar_days(day_minutes, *month_range(year, mon))
+
+
+def legacy_histogram_section(items: list[HistogramBucket]) -> LegacyHistogramOut:
+    """Shape used by /progress/weekly, /monthly and /yearly."""
+    return LegacyHistogramOut(items=[LegacyHistogramBar(day=b.label, sessions=b.sessions, ratio=b.ratio) for b in items])
+
+
+def weekly_section(day_sessions: dict[date, int], today: date) -> LegacyHistogramOut:
+    start, end = default_range("day", today)
+    spans = buckets("day", start, end)
+    return legacy_histogram_section(shape(spans, {(d,): n for d, n in day_sessions.items()}))
+
+
+async def dashboard_sections(
+    db: AsyncSession,
+    user_id: int,
+    sections: set[str],
+    year: int,
+    mon: int,
+    today: date | None = None,
+) -> dict:
+    """Summary, breakdown, calendar and weekly sections (by name) from one rollup fetch.
+
+    ``recent`` is built by the caller, since it reads raw sessions.
+    """
+    today = today or datetime.utcnow().date()
+    out = {}
+    if "summary" in sections:
+        out["summary"] = summary_section(await db.run_sync(load_progress, user_id))
+    if not sections & {"breakdown", "calendar", "weekly"}:
+        return out
+
+    cal_start, cal_end = month_range(year, mon)
+    week_start, week_end = default_range("day", today)
+    q = select(UserDailyStat.day, UserDailyStat.pillar, UserDailyStat.sessions, UserDailyStat.minutes).where(
+        UserDailyStat.user_id == user_id,
+    )
+    if "breakdown" not in sections:
+        lo = min(d for d, flag in ((cal_start, "calendar"), (week_start, "weekly")) if flag in sections)
+        hi = max(d for d, flag in ((cal_end, "calendar"), (week_end, "weekly")) if flag in sections)
+        q = q.where(UserDailyStat.day >= lo, UserDailyStat.day < hi)
+
+    per_pillar: dict[str, list[int]] = {}
+    day_minutes: dict[date, int] = defaultdict(int)
+    day_sessions: dict[date, int] = defaultdict(int)
+    for day, pillar, n, minutes in await db.execute(q):
+        agg = per_pillar.setdefault(pillar, [0, 0])
+        agg[0] += n
+        agg[1] += minutes
+        day_minutes[day] += minutes
+        day_sessions[day] += n
+
+    if "breakdown" in sections:
+        out["breakdown"] = breakdown_section((p, agg[0], agg[1]) for p, agg in sorted(per_pillar.items()))
+    if "calendar" in sections:
+        out["calendar"] = calendar_section(day_minutes, year, mon)
+    if "weekly" in sections:
+        out["weekly"] = weekly_section(
+            {d: n for d, n in day_sessions.items() if week_start <= d < week_end}, today
+        )
+    return out
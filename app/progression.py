@@ -0,0 +1,161 @@
+"""
+Per-user challenge progression: which challenge comes next in each
+(pillar, energy level) sequence.
+
+``challenge_cursors`` holds, per user and group, the ``next_number`` to offer
+and the current ``cycle``, so ``/challenges/next`` is a primary-key lookup plus
+an in-memory pick from the cached catalog page. Completions are stamped with
+the cycle they belong to and kept as history; finishing the last challenge
+of a group starts the next cycle instead of deleting the user's completions.
+
+``record_completion`` runs inside the ``complete_challenge`` transaction with
+the cursor row locked, so concurrent completions advance it one at a time.
+A group's cursor row is created by the user's first completion in it, or by
+``backfill_cursors`` for pre-existing completions, initialised from the
+user's cycle 0 completions. ``/challenges/next`` never writes: without a row
+it positions an unsaved cursor the same way. Like ``app.rollups``, these
+helpers are sync and called through ``AsyncSession.run_sync``.
+"""
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session as DBSession
+
+from .database import dialect_insert
+from .models import Challenge, ChallengeCompletion, ChallengeCursor
+
+
+def _first_open(page: list[dict], done: set[int], after: int | None = None) -> dict | None:
+    """First challenge in ``page`` (ordered by number) not in ``done``, optionally past number ``after``."""
+    for item in page:
+        if (after is None or item["number"] > after) and item["id"] not in done:
+            return item
+    return None
+
+
+def _completed_ids(db: DBSession, cursor: ChallengeCursor) -> set[int]:
+    return set(db.scalars(select(ChallengeCompletion.challenge_id).where(
+        ChallengeCompletion.user_id == cursor.user_id,
+        ChallengeCompletion.pillar == cursor.pillar,
+        ChallengeCompletion.energy_level == cursor.energy_level,
+        ChallengeCompletion.cycle == cursor.cycle,
+    )))
+
+
+def _advance(cursor: ChallengeCursor, page: list[dict], done: set[int], after: int | None = None) -> None:
+    """Point the cursor at the next open challenge, starting a new cycle past the end."""
+    item = _first_open(page, done, after)
+    if item is None and page:
+        cursor.cycle += 1
+        item = page[0]
+    if item is not None:
+        cursor.next_number = item["number"]
+
+
+def _offered(page: list[dict], cursor: ChallengeCursor) -> dict:
+    for item in page:
+        if item["number"] >= cursor.next_number:
+            return item
+    # The catalog shrank below the cursor; offer the start of the sequence
+    return page[0]
+
+
+def _new_cursor(db: DBSession, user_id: int, pillar: str, energy_level: str, page: list[dict]) -> ChallengeCursor:
+    """Unsaved cursor for a group without a row, positioned past the user's cycle 0 completions."""
+    cursor = ChallengeCursor(user_id=user_id, pillar=pillar, energy_level=energy_level, next_number=1, cycle=0)
+    _advance(cursor, page, _completed_ids(db, cursor))
+    return cursor
+
+
+def _cursor_for_update(
+    db: DBSession, user_id: int, pillar: str, energy_level: str, page: list[dict],
+) -> tuple[ChallengeCursor, set[int] | None]:
+    """Lock the user's cursor for this group, creating it from existing completions if missing.
+
+    Also returns the current cycle's completed ids when it had to load them.
+    """
+    insert = dialect_insert(db)
+    created = db.execute(
+        insert(ChallengeCursor).values(
+            user_id=user_id, pillar=pillar, energy_level=energy_level, next_number=1, cycle=0,
+        ).on_conflict_do_nothing(
+            index_elements=[ChallengeCursor.user_id, ChallengeCursor.pillar, ChallengeCursor.energy_level],
+        )
+    ).rowcount == 1
+    cursor = db.query(ChallengeCursor).filter(
+        ChallengeCursor.user_id == user_id,
+        ChallengeCursor.pillar == pillar,
+        ChallengeCursor.energy_level == energy_level,
+    ).with_for_update().populate_existing().one()
+    done = None
+    if created:
+        done = _completed_ids(db, cursor)
+        _advance(cursor, page, done)
+    return cursor, done
+
+
+def next_challenge(db: DBSession, user_id: int, pillar: str, energy_level: str, page: list[dict]) -> dict | None:
+    """The challenge to offer next from ``page``; read-only (a missing cursor is computed, not stored)."""
+    if not page:
+        return None
+    cursor = db.get(ChallengeCursor, (user_id, pillar, energy_level))
+    if cursor is None:
+        cursor = _new_cursor(db, user_id, pillar, energy_level, page)
+    return _offered(page, cursor)
+
+
+def record_completion(db: DBSession, user_id: int, challenge: dict, page: list[dict]) -> bool:
+    """Record ``challenge`` as completed in the current cycle and advance the cursor.
+
+    ``page`` is the catalog page for the challenge's group. Returns False if it
+    was already completed this cycle. Committed by the caller.
+    """
+    cursor, done = _cursor_for_update(db, user_id, challenge["pillar"], challenge["energy_level"], page)
+    insert = dialect_insert(db)
+    inserted = db.execute(
+        insert(ChallengeCompletion).values(
+            user_id=user_id,
+            challenge_id=challenge["id"],
+            pillar=challenge["pillar"],
+            energy_level=challenge["energy_level"],
+            cycle=cursor.cycle,
+        ).on_conflict_do_nothing(
+            index_elements=[ChallengeCompletion.user_id, ChallengeCompletion.challenge_id, ChallengeCompletion.cycle],
+        )
+    ).rowcount == 1
+    if inserted and challenge["id"] == _offered(page, cursor)["id"]:
+        # Skip past challenges already completed out of order in this cycle
+        done = _completed_ids(db, cursor) if done is None else done | {challenge["id"]}
+        _advance(cursor, page, done, after=challenge["number"])
+    return inserted
+
+
+def backfill_cursors(db: DBSession, user_id: int | None = None) -> int:
+    """Create the cursors missing for groups with completions (all users, or one). Returns rows created."""
+    pages: dict[tuple[str, str], list[dict]] = {}
+    for cid, pillar, energy_level, number in db.execute(
+        select(Challenge.id, Challenge.pillar, Challenge.energy_level, Challenge.number)
+        .order_by(Challenge.pillar, Challenge.energy_level, Challenge.number)
+    ):
+        pages.setdefault((pillar, energy_level), []).append({"id": cid, "number": number})
+    groups = select(ChallengeCompletion.user_id, ChallengeCompletion.pillar, ChallengeCompletion.energy_level).where(
+        ~exists().where(
+            ChallengeCursor.user_id == ChallengeCompletion.user_id,
+            ChallengeCursor.pillar == ChallengeCompletion.pillar,
+            ChallengeCursor.energy_level == ChallengeCompletion.energy_level,
+        )
+    ).distinct()
+    if user_id is not None:
+        groups = groups.where(ChallengeCompletion.user_id == user_id)
+    rows = []
+    for uid, pillar, energy_level in db.execute(groups).all():
+        cursor = _new_cursor(db, uid, pillar, energy_level, pages.get((pillar, energy_level), []))
+        rows.append({
+            "user_id": uid, "pillar": pillar, "energy_level": energy_level,
+            "next_number": cursor.next_number, "cycle": cursor.cycle,
+        })
+    if rows:
+        # A concurrent completion may have created the cursor meanwhile; keep that one
+        insert = dialect_insert(db)
+        db.execute(insert(ChallengeCursor).on_conflict_do_nothing(
+            index_elements=[ChallengeCursor.user_id, ChallengeCursor.pillar, ChallengeCursor.energy_level],
+        ), rows)
+    return len(rows)
@@ -0,0 +1,76 @@
+"""
+Read-replica routing for the GET endpoints.
+
+With ``DATABASE_READ_URL`` set, GET routes take their session from
+``get_read_db``, which reads from the replica; everything else keeps using
+the primary (``get_async_db``). Without a replica ``get_read_db`` is simply a
+primary session.
+
+Read-your-writes: write endpoints pass their response through ``mark_write``,
+which keeps that user's reads on the primary for ``READ_YOUR_WRITES_SECONDS``,
+both in-process (keyed by user id) and, for requests that land on another
+instance, through a short-lived ``last_write`` cookie. Read paths never
+write (missing progress counters and challenge cursors are computed, not
+stored), so they run unchanged against a read-only replica.
+"""
+import math
+import time
+
+from fastapi import Request
+from jose import JWTError, jwt
+from starlette.responses import Response
+
+from .auth import TTLCache
+from .config import AUTH_CACHE_MAX_SIZE, READ_YOUR_WRITES_SECONDS
+from .database import AsyncReadSessionLocal, AsyncSessionLocal, async_read_engine
+
+LAST_WRITE_COOKIE = "last_write"
+
+_recent_writers = TTLCache(AUTH_CACHE_MAX_SIZE, READ_YOUR_WRITES_SECONDS)
+
+
+def _token_user_id(request: Request) -> int | None:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        # Unverified: this only picks a database; get_current_user still verifies the token
+        user_id = jwt.get_unverified_claims(token).get("uid")
+    except JWTError:
+        return None
+    return user_id if isinstance(user_id, int) else None
+
+
+def reads_primary(request: Request) -> bool:
+    """Whether this request's caller wrote within the read-your-writes window."""
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, "0"))
+    except ValueError:
+        last_write = 0.0
+    if time.time() - last_write < READ_YOUR_WRITES_SECONDS:
+        return True
+    user_id = _token_user_id(request)
+    return user_id is not None and _recent_writers.get(user_id) is not None
+
+
+def mark_write(response: Response, user_id: int) -> Response:
+    """Pin ``user_id``'s reads to the primary for the read-your-writes window."""
+    if async_read_engine is None:
+        return response
+    _recent_writers.set(user_id, True)
+    response.set_cookie(
+        LAST_WRITE_COOKIE, f"{time.time():.3f}",
+        max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax",
+    )
+    return response
+
+
+def read_sessionmaker(request: Request):
+    """Session factory for a GET request: the replica, or the primary right after the caller wrote."""
+    return AsyncSessionLocal if async_read_engine is None or reads_primary(request) else AsyncReadSessionLocal
+
+
+async def get_read_db(request: Request):
+    """Async session for a GET route (see ``read_sessionmaker``)."""
+    async with read_sessionmaker(request)() as db:
+        yield db
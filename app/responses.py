@@ -0,0 +1,32 @@
+"""
+JSON responses encoded straight from response models.
+
+FastAPI's default path turns a route's return value into plain Python data
+(``jsonable_encoder``, or validate-then-dump when a ``response_model`` is
+set) and then runs ``json.dumps`` over it. Routes here declare
+``response_model`` for the OpenAPI schema but return ``json_response(...)``:
+a cached ``TypeAdapter`` per response type serializes the model instances to
+bytes in pydantic-core, and FastAPI passes a returned ``Response`` through
+untouched. ``ORJSONResponse`` is the app's default response class for
+anything that still returns plain data.
+"""
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+__all__ = ["ORJSONResponse", "adapter", "json_response"]
+
+
+@lru_cache(maxsize=None)
+def adapter(model: Any) -> TypeAdapter:
+    """The compiled ``TypeAdapter`` for ``model`` (``list[X]`` and friends included)."""
+    return TypeAdapter(model)
+
+
+def json_response(value: Any, model: Any = None, status_code: int = 200, **dump_kwargs) -> Response:
+    """``value`` (an instance of ``model``, default its own type) serialized to a JSON response."""
+    body = adapter(model or type(value)).dump_json(value, **dump_kwargs)
+    return Response(content=body, status_code=status_code, media_type="application/json")
@@ -0,0 +1,322 @@
+"""
+Per-user session aggregates maintained alongside the raw rows.
+
+- ``user_daily_stats``: per (user, day, pillar) session/minute/point sums
+- ``user_progress``: running totals, completed count and current streak
+- ``user_weekly_points``: per (user, week) point sums (weekly leaderboard)
+
+``record_sessions`` / ``record_completions`` are called by the write endpoints
+inside their transaction (via ``AsyncSession.run_sync``, so the same code
+serves the async request path and the sync maintenance commands). ``backfill``
+rebuilds the daily and weekly tables from ``sessions`` and creates missing
+progress rows and challenge cursors; ``check`` recomputes progress counters
+from raw rows:
+
+    python -m app.rollups backfill [user_id]
+    python -m app.rollups check [--fix]
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.orm import Session as DBSession
+
+from .database import SessionLocal, dialect_insert
+from .models import ChallengeCompletion, Session, UserDailyStat, UserProgress, UserWeeklyPoints
+from .progression import backfill_cursors
+
+
+def session_day(started_at: datetime) -> date:
+    if started_at.tzinfo is not None:
+        started_at = started_at.astimezone(timezone.utc)
+    return started_at.date()
+
+
+def week_start(day: date) -> date:
+    """Monday of the week containing ``day``."""
+    return day - timedelta(days=day.weekday())
+
+
+def _streak_ending_at(days_desc: Iterable[date]) -> tuple[date | None, int]:
+    """Most recent active day and the length of the run of consecutive days ending there."""
+    last = prev = None
+    streak = 0
+    for d in days_desc:
+        if last is None:
+            last = prev = d
+            streak = 1
+        elif d == prev - timedelta(days=1):
+            streak += 1
+            prev = d
+        elif d != prev:
+            break
+    return last, streak
+
+
+def compute_progress(db: DBSession, user_id: int, today: date | None = None) -> dict:
+    """Recompute ``user_progress`` values for one user from the raw tables."""
+    today = today or datetime.utcnow().date()
+    seconds, points = db.query(
+        func.coalesce(func.sum(Session.duration_seconds), 0),
+        func.coalesce(func.sum(Session.points), 0),
+    ).filter(Session.user_id == user_id).one()
+    completed = db.query(func.count(ChallengeCompletion.id)).filter(ChallengeCompletion.user_id == user_id).scalar()
+    days = db.query(Session.started_at).filter(
+        Session.user_id == user_id,
+        Session.started_at < datetime.combine(today + timedelta(days=1), datetime.min.time()),
+    ).order_by(Session.started_at.desc())
+    last, streak = _streak_ending_at(session_day(started_at) for (started_at,) in days.yield_per(500))
+    return {
+        "streak_days": streak,
+        "last_active_day": last,
+        "total_seconds": seconds,
+        "total_points": points,
+        "completed_count": completed,
+    }
+
+
+def _progress_for_update(db: DBSession, user_id: int) -> tuple[UserProgress, bool]:
+    """Lock the user's progress row, creating it from raw rows if missing.
+
+    Returns ``(row, created)``; a freshly created row already reflects
+    everything flushed in this transaction, so callers must not re-apply it.
+    """
+    insert = dialect_insert(db)
+    created = db.execute(
+        insert(UserProgress).values(user_id=user_id).on_conflict_do_nothing(index_elements=[UserProgress.user_id])
+    ).rowcount == 1
+    prog = db.query(UserProgress).filter(UserProgress.user_id == user_id).with_for_update().populate_existing().one()
+    if created:
+        for k, v in compute_progress(db, user_id).items():
+            setattr(prog, k, v)
+    return prog, created
+
+
+def _extend_streak(prog: UserProgress, db: DBSession, days: set[date], today: date) -> None:
+    days = sorted(d for d in days if d <= today)
+    if not days:
+        return
+    if prog.last_active_day is not None and days[0] < prog.last_active_day:
+        # Back-dated session (e.g. offline sync) may bridge a gap; re-walk the daily rollup
+        rows = db.query(UserDailyStat.day).filter(
+            UserDailyStat.user_id == prog.user_id,
+            UserDailyStat.day <= today,
+        ).distinct().order_by(UserDailyStat.day.desc())
+        prog.last_active_day, prog.streak_days = _streak_ending_at(d for (d,) in rows)
+        return
+    for day in days:
+        last = prog.last_active_day
+        if last is None or day > last:
+            prog.streak_days = prog.streak_days + 1 if last is not None and day == last + timedelta(days=1) else 1
+            prog.last_active_day = day
+
+
+def record_completions(db: DBSession, user_id: int, delta: int) -> None:
+    """Adjust the completed count after completions were added (or removed) and flushed."""
+    prog, created = _progress_for_update(db, user_id)
+    if not created:
+        prog.completed_count = max(prog.completed_count + delta, 0)
+
+
+def load_progress(db: DBSession, user_id: int) -> UserProgress:
+    """Progress row for reads; computed from raw rows, unsaved, for users without one.
+
+    Reads never write: the row is created by the user's next session or
+    completion (``record_sessions`` / ``record_completions``) or by ``backfill``.
+    """
+    prog = db.get(UserProgress, user_id)
+    if prog is None:
+        return UserProgress(user_id=user_id, **compute_progress(db, user_id))
+    return prog
+
+
+def current_streak(prog: UserProgress, today: date | None = None) -> int:
+    """Streak as of ``today``; a streak not extended today has lapsed."""
+    today = today or datetime.utcnow().date()
+    return prog.streak_days if prog.last_active_day == today else 0
+
+
+def record_sessions(db: DBSession, sessions: Iterable[Session]) -> None:
+    """Add new (already flushed) sessions to the aggregates; committed by the caller."""
+    sessions = list(sessions)
+    totals: dict[tuple[int, date, str], list[int]] = {}
+    for s in sessions:
+        key = (s.user_id, session_day(s.started_at), s.pillar)
+        agg = totals.setdefault(key, [0, 0, 0, 0])
+        agg[0] += 1
+        agg[1] += s.duration_seconds
+        agg[2] += s.duration_seconds // 60
+        agg[3] += s.points
+    if not totals:
+        return
+    insert = dialect_insert(db)
+    stmt = insert(UserDailyStat).values([
+        {
+            "user_id": user_id,
+            "day": day,
+            "pillar": pillar,
+            "sessions": agg[0],
+            "seconds": agg[1],
+            "minutes": agg[2],
+            "points": agg[3],
+        }
+        for (user_id, day, pillar), agg in totals.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyStat.user_id, UserDailyStat.day, UserDailyStat.pillar],
+        set_={
+            "sessions": UserDailyStat.sessions + stmt.excluded.sessions,
+            "seconds": UserDailyStat.seconds + stmt.excluded.seconds,
+            "minutes": UserDailyStat.minutes + stmt.excluded.minutes,
+            "points": UserDailyStat.points + stmt.excluded.points,
+        },
+    )
+    db.execute(stmt)
+
+    weekly: dict[tuple[int, date], int] = {}
+    for (user_id, day, _), agg in totals.items():
+        key = (user_id, week_start(day))
+        weekly[key] = weekly.get(key, 0) + agg[3]
+    stmt = insert(UserWeeklyPoints).values([
+        {"user_id": user_id, "week_start": week, "points": points} for (user_id, week), points in weekly.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserWeeklyPoints.user_id, UserWeeklyPoints.week_start],
+        set_={"points": UserWeeklyPoints.points + stmt.excluded.points},
+    ))
+
+    today = datetime.utcnow().date()
+    for user_id in sorted({s.user_id for s in sessions}):
+        prog, created = _progress_for_update(db, user_id)
+        if created:
+            continue
+        own = [s for s in sessions if s.user_id == user_id]
+        prog.total_seconds += sum(s.duration_seconds for s in own)
+        prog.total_points += sum(s.points for s in own)
+        _extend_streak(prog, db, {session_day(s.started_at) for s in own}, today)
+
+
+def _users_without_progress(db: DBSession, user_id: int | None = None) -> list[int]:
+    """Users with sessions or completions but no ``user_progress`` row (all users, or one)."""
+    active = select(Session.user_id).union(select(ChallengeCompletion.user_id)).subquery()
+    q = select(active.c.user_id).where(~exists().where(UserProgress.user_id == active.c.user_id))
+    if user_id is not None:
+        q = q.where(active.c.user_id == user_id)
+    return list(db.scalars(q.order_by(active.c.user_id)))
+
+
+def check(db: DBSession, fix: bool = False) -> list[tuple[int, str, object, object]]:
+    """Compare stored progress counters to raw rows; returns (user_id, field, stored, actual).
+
+    A user with raw rows but no progress row is reported once, as field
+    ``user_progress`` with ``stored=None``; ``fix`` creates the row.
+    """
+    today = datetime.utcnow().date()
+    mismatches = []
+    for prog in db.query(UserProgress).order_by(UserProgress.user_id):
+        actual = compute_progress(db, prog.user_id, today)
+        for k, v in actual.items():
+            if getattr(prog, k) != v:
+                mismatches.append((prog.user_id, k, getattr(prog, k), v))
+        if fix:
+            for k, v in actual.items():
+                setattr(prog, k, v)
+    for user_id in _users_without_progress(db):
+        mismatches.append((user_id, "user_progress", None, "missing"))
+        if fix:
+            db.add(UserProgress(user_id=user_id, **compute_progress(db, user_id, today)))
+    return mismatches
+
+
+def backfill(db: DBSession, user_id: int | None = None) -> dict[str, int]:
+    """Rebuild rollup rows from raw rows (all users, or one).
+
+    Returns row counts: ``daily`` written, ``progress`` and ``cursors``
+    created. Existing ``user_progress`` rows are kept (``check --fix``
+    corrects their values), as are existing challenge cursors.
+    """
+    clear = delete(UserDailyStat)
+    source = select(
+        Session.user_id,
+        func.date(Session.started_at),
+        Session.pillar,
+        func.count(Session.id),
+        func.sum(Session.duration_seconds),
+        func.sum(Session.duration_seconds // 60),
+        func.sum(Session.points),
+    ).group_by(Session.user_id, func.date(Session.started_at), Session.pillar)
+    if user_id is not None:
+        clear = clear.where(UserDailyStat.user_id == user_id)
+        source = source.where(Session.user_id == user_id)
+    db.execute(clear)
+    result = db.execute(
+        UserDailyStat.__table__.insert().from_select(
+            ["user_id", "day", "pillar", "sessions", "seconds", "minutes", "points"], source
+        )
+    )
+    _backfill_weekly(db, user_id)
+    return {
+        "daily": result.rowcount,
+        "progress": _backfill_progress(db, user_id),
+        "cursors": backfill_cursors(db, user_id),
+    }
+
+
+def _backfill_weekly(db: DBSession, user_id: int | None = None) -> None:
+    """Rebuild ``user_weekly_points`` from the (already rebuilt) daily rollup."""
+    clear = delete(UserWeeklyPoints)
+    days = select(UserDailyStat.user_id, UserDailyStat.day, func.sum(UserDailyStat.points)).group_by(
+        UserDailyStat.user_id, UserDailyStat.day,
+    )
+    if user_id is not None:
+        clear = clear.where(UserWeeklyPoints.user_id == user_id)
+        days = days.where(UserDailyStat.user_id == user_id)
+    db.execute(clear)
+    weekly: dict[tuple[int, date], int] = {}
+    for uid, day, points in db.execute(days):
+        key = (uid, week_start(day))
+        weekly[key] = weekly.get(key, 0) + points
+    if weekly:
+        db.execute(UserWeeklyPoints.__table__.insert(), [
+            {"user_id": uid, "week_start": week, "points": points} for (uid, week), points in weekly.items()
+        ])
+
+
+def _backfill_progress(db: DBSession, user_id: int | None = None) -> int:
+    """Create the ``user_progress`` rows missing for users with sessions or completions."""
+    today = datetime.utcnow().date()
+    rows = [{"user_id": uid, **compute_progress(db, uid, today)} for uid in _users_without_progress(db, user_id)]
+    if rows:
+        # A concurrent write may have created the row meanwhile; it is already current
+        insert = dialect_insert(db)
+        db.execute(insert(UserProgress).on_conflict_do_nothing(index_elements=[UserProgress.user_id]), rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("backfill", "check"):
+        print("Usage: python -m app.rollups backfill [user_id] | check [--fix]")
+        raise SystemExit(1)
+    from .database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if sys.argv[1] == "backfill":
+            counts = backfill(db, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+            db.commit()
+            print(
+                f"Rebuilt {counts['daily']} user_daily_stats rows and user_weekly_points; "
+                f"created {counts['progress']} user_progress and {counts['cursors']} challenge_cursors rows"
+            )
+        else:
+            fix = "--fix" in sys.argv[2:]
+            mismatches = check(db, fix=fix)
+            for user_id, field, stored, actual in mismatches:
+                print(f"user {user_id}: {field} stored={stored} actual={actual}")
+            if fix:
+                db.commit()
+            print(f"{len(mismatches)} mismatches" + (" fixed" if fix and mismatches else ""))
+            if mismatches and not fix:
+                raise SystemExit(2)
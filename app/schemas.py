@@ -1,19 +1,26 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 
 
-class Token(BaseModel):
+class Schema(BaseModel):
+    # Validators and serializers are built on first use rather than at import
+    # (including the adapters FastAPI makes per route), so a cold start only
+    # pays for the schemas of the routes it serves
+    model_config = ConfigDict(defer_build=True, experimental_defer_build_mode=("model", "type_adapter"))
+
+
+class Token(Schema):
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
 
 
-class TokenPayload(BaseModel):
+class TokenPayload(Schema):
     sub: str
     type: str
 
 
-class UserBase(BaseModel):
+class UserBase(Schema):
     username: str
     email: EmailStr
 
@@ -23,22 +30,21 @@ class UserCreate(UserBase):
 
 
 class UserOut(UserBase):
-    id: int
+    model_config = ConfigDict(from_attributes=True)
 
-    class Config:
-        orm_mode = True
+    id: int
 
 
-class LoginRequest(BaseModel):
+class LoginRequest(Schema):
     email: EmailStr
     password: str
 
 
-class RefreshRequest(BaseModel):
+class RefreshRequest(Schema):
     token: str
 
 
-class SessionCreate(BaseModel):
+class SessionCreate(Schema):
     challenge_id: int
     duration_seconds: int
     intensity: str | None = "MEDIUM"
@@ -46,7 +52,7 @@ class SessionCreate(BaseModel):
     ended_at: datetime | None = None
 
 
-class SessionOut(BaseModel):
+class SessionOut(Schema):
     id: int
     challenge_id: int
     pillar: str
@@ -58,8 +64,146 @@ class SessionOut(BaseModel):
     points: int
 
 
-class SummaryOut(BaseModel):
+# Most sessions one /sessions/batch request may carry
+MAX_SESSION_BATCH = 500
+
+
+class SessionBatchItem(SessionCreate):
+    # Client-chosen, unique per user; replaying an item with a known key returns the stored session
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=64)
+
+
+class SessionBatch(Schema):
+    sessions: list[SessionBatchItem] = Field(min_length=1, max_length=MAX_SESSION_BATCH)
+
+
+class SessionBatchOut(SessionOut):
+    idempotency_key: str | None = None
+
+
+class SummaryOut(Schema):
     completed_count: int
     total_minutes: int
     streak_days: int
-    points: int
\ No newline at end of file
+    points: int
+
+class StatusOut(Schema):
+    status: str
+
+
+class PoolStatsOut(Schema):
+    mode: str
+    pool: str
+    status: str
+    # Only for pools that keep connections (QueuePool)
+    size: int | None = None
+    checked_in: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+
+
+class ChallengeOut(Schema):
+    id: int
+    pillar: str
+    energy_level: str
+    number: int
+    name: str
+    duration_minutes: int
+    description: str
+    steps: list[str]
+
+
+class ChallengePage(Schema):
+    items: list[ChallengeOut]
+
+
+class NextChallengeOut(Schema):
+    item: ChallengeOut | None
+
+
+class ActivityItem(Schema):
+    id: int
+    challenge_id: int
+    title: str | None
+    started_at: datetime
+    duration_minutes: int
+    intensity: str
+    points: int
+
+
+class ActivityPage(Schema):
+    items: list[ActivityItem]
+    next_cursor: str | None
+
+
+class BreakdownItem(Schema):
+    pillar: str
+    sessions: int
+    minutes: int
+    percentage: int
+
+
+class BreakdownOut(Schema):
+    items: list[BreakdownItem]
+
+
+class CalendarDay(Schema):
+    date: str
+    activity: int
+
+
+class CalendarOut(Schema):
+    items: list[CalendarDay]
+
+
+class CalendarLevelsOut(Schema):
+    start: str
+    end: str
+    # One digit per day from start to end inclusive: activity level 0, 1 or 2 (as CalendarDay.activity)
+    levels: str
+
+
+class HistogramBucket(Schema):
+    label: str
+    start: str
+    end: str
+    sessions: int
+    ratio: float
+
+
+class HistogramOut(Schema):
+    granularity: str
+    items: list[HistogramBucket]
+
+
+class LegacyHistogramBar(Schema):
+    day: str
+    sessions: int
+    ratio: float
+
+
+class LegacyHistogramOut(Schema):
+    items: list[LegacyHistogramBar]
+
+
+class DashboardOut(Schema):
+    # Only the requested sections are set (and serialized)
+    summary: SummaryOut | None = None
+    breakdown: BreakdownOut | None = None
+    calendar: CalendarOut | None = None
+    weekly: LegacyHistogramOut | None = None
+    recent: ActivityPage | None = None
+
+
+class LeaderboardEntry(Schema):
+    rank: int
+    user_id: int
+    username: str
+    points: int
+
+
+class LeaderboardOut(Schema):
+    period: str
+    week_start: str | None
+    items: list[LeaderboardEntry]
+    me: LeaderboardEntry
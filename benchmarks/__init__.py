@@ -0,0 +1,5 @@
+"""
+Benchmarks and checks for the CorpFinity backend.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_password``.
+"""
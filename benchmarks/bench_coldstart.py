@@ -0,0 +1,204 @@
+"""
+Cold-start cost of the Vercel entry point (``api/index.py``).
+
+Every measurement runs in a fresh interpreter, as a cold function instance
+would:
+
+- import: wall time of ``import api.index``, plus a per-module breakdown of
+  one run from ``python -X importtime`` (self time per top-level package and
+  per ``app.*`` module)
+- first request: for each endpoint scenario of ``benchmarks.bench_endpoints``,
+  a new process imports the app and times its first request against a
+  seeded scratch database (``--url``, default a temporary SQLite file)
+
+    python -m benchmarks.bench_coldstart [--runs 3] [--only /progress] \
+        [--max-import-ms 2000] [--max-first-request-ms 1000] [--json]
+
+Reports medians. Exits 1 if the median import time or any route's median
+first request exceeds its threshold, or a first request fails.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+# Defaults for the regression check; tune per runner with the flags
+MAX_IMPORT_MS = 2000.0
+MAX_FIRST_REQUEST_MS = 1000.0
+TOP_PACKAGES = 15
+
+
+def _child(route: str | None) -> dict:
+    import httpx  # the harness's client, not part of the app's cold start
+
+    start = time.perf_counter()
+    from api.index import app
+    out = {"import_ms": (time.perf_counter() - start) * 1000}
+    if route is None:
+        return out
+
+    from benchmarks.bench_endpoints import scenarios
+
+    ctx = json.loads(os.environ["COLDSTART_CTX"])
+    ctx["seq"] = itertools.count()
+    case = next(s for s in scenarios() if s.name == route)
+    request = case.build(ctx, int(os.environ.get("COLDSTART_RUN", "0")))
+
+    async def first():
+        from app.auth import password_pool
+        from app.database import async_engine, async_read_engine
+
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://cold") as client:
+                t = time.perf_counter()
+                r = await client.request(case.method, **request)
+                return r.status_code, (time.perf_counter() - t) * 1000
+        finally:
+            # Open pool connections and hash workers would keep the child from exiting
+            await async_engine.dispose()
+            if async_read_engine is not None:
+                await async_read_engine.dispose()
+            password_pool.shutdown()
+
+    status, elapsed = asyncio.run(first())
+    out.update(first_request_ms=elapsed, ok=status in case.expect, status=status)
+    return out
+
+
+def _spawn(env: dict, route: str | None = None, run: int = 0) -> dict:
+    args = [sys.executable, "-m", "benchmarks.bench_coldstart", "--child"] + (["--route", route] if route else [])
+    proc = subprocess.run(args, env=dict(env, COLDSTART_RUN=str(run)), capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"cold start child failed ({route or 'import'})")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def import_breakdown(env: dict) -> list[dict]:
+    """Self import time (ms) per top-level package and per ``app.*`` module, largest first."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api.index"],
+                          env=env, capture_output=True, text=True)
+    packages: Counter = Counter()
+    app_modules: Counter = Counter()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        packages[name.split(".")[0]] += int(self_us)
+        if name == "app" or name.startswith("app.") or name.startswith("api."):
+            app_modules[name] += int(self_us)
+    rows = [{"module": name, "ms": round(us / 1000, 1)} for name, us in packages.most_common(TOP_PACKAGES)]
+    rows += [{"module": name, "ms": round(us / 1000, 1)} for name, us in app_modules.most_common()]
+    return rows
+
+
+def _prepare(url: str) -> dict:
+    """Seed the scratch database and fetch tokens, in a throwaway process of our own."""
+    os.environ.update(DATABASE_URL=url)
+    from sqlalchemy import create_engine
+
+    from app.config import _normalize_pg_url
+    from benchmarks.bench_endpoints import _prepare as tokens
+    from benchmarks.seed import seed
+
+    engine = create_engine(_normalize_pg_url(url))
+    try:
+        seed(engine, users=3, sessions_per_user=200, completions_per_user=10)
+    finally:
+        engine.dispose()
+
+    async def fetch():
+        from app.database import async_engine
+
+        try:
+            return await tokens(3)
+        finally:
+            await async_engine.dispose()
+
+    ctx = asyncio.run(fetch())
+    ctx.pop("seq")
+    return ctx
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="scratch database URL; default: temporary SQLite file")
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per measurement")
+    parser.add_argument("--only", action="append", help="only endpoints whose name contains this (repeatable)")
+    parser.add_argument("--max-import-ms", type=float, default=MAX_IMPORT_MS)
+    parser.add_argument("--max-first-request-ms", type=float, default=MAX_FIRST_REQUEST_MS)
+    parser.add_argument("--json", action="store_true", help="emit the report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--route", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(_child(args.route)))
+        return
+
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{tmp.name}"
+    env = dict(os.environ, DATABASE_URL=url)
+    try:
+        ctx = _prepare(url)
+        env["COLDSTART_CTX"] = json.dumps(ctx)
+        imports = [_spawn(env, run=i)["import_ms"] for i in range(args.runs)]
+        report = {
+            "import_ms": round(statistics.median(imports), 1),
+            "modules": import_breakdown(env),
+            "routes": [],
+        }
+        from benchmarks.bench_endpoints import scenarios
+
+        for case in scenarios():
+            if args.only and not any(o in case.name for o in args.only):
+                continue
+            runs = [_spawn(env, case.name, run=i) for i in range(args.runs)]
+            report["routes"].append({
+                "endpoint": case.name,
+                "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+                "first_request_ms": round(statistics.median(r["first_request_ms"] for r in runs), 1),
+                "total_ms": round(statistics.median(r["import_ms"] + r["first_request_ms"] for r in runs), 1),
+                "errors": sum(not r["ok"] for r in runs),
+            })
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    problems = []
+    if report["import_ms"] > args.max_import_ms:
+        problems.append(f"import api.index: {report['import_ms']}ms > {args.max_import_ms}ms")
+    for r in report["routes"]:
+        if r["first_request_ms"] > args.max_first_request_ms:
+            problems.append(f"{r['endpoint']}: first request {r['first_request_ms']}ms > {args.max_first_request_ms}ms")
+        if r["errors"]:
+            problems.append(f"{r['endpoint']}: {r['errors']} failed first requests")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import api.index: {report['import_ms']}ms (median of {args.runs})")
+        for m in report["modules"]:
+            print(f"  {m['module']:<36} {m['ms']:>8.1f}ms")
+        print(f"{'endpoint':<36} {'import ms':>10} {'first req ms':>13} {'total ms':>9}")
+        for r in report["routes"]:
+            print(f"{r['endpoint']:<36} {r['import_ms']:>10} {r['first_request_ms']:>13} {r['total_ms']:>9}"
+                  + (f" errors={r['errors']}" if r["errors"] else ""))
+    for p in problems:
+        print(f"FAIL {p}", file=sys.stderr)
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+End-to-end latency, throughput and queries per request for every endpoint.
+
+Seeds a scratch database (``benchmarks.seed``), then drives each route of
+``app.main`` in-process through an ASGI client at the chosen concurrency
+levels. The app's engines are built from ``--url``, which defaults to a
+temporary SQLite file:
+
+    python -m benchmarks.bench_endpoints --url postgresql://postgres@localhost/bench \
+        --users 500 --sessions-per-user 300 --concurrency 1,10,50 --out results.json
+    python -m benchmarks.bench_endpoints --compare results.json   # p95 / query deltas vs a baseline
+
+Output is one JSON document (``--out`` or stdout) with a ``meta`` block
+(commit, database, seed sizes, Argon2 costs) so runs can be compared across
+commits. Seeding is deterministic; writes go to the scratch database.
+"""
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+_queries: contextvars.ContextVar = contextvars.ContextVar("bench_queries", default=None)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class Scenario:
+    """One endpoint call; ``build(ctx, i)`` returns httpx request kwargs for the i-th call."""
+
+    def __init__(self, name: str, method: str, build, expect: tuple[int, ...] = (200,)):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.expect = expect
+
+
+def scenarios() -> list[Scenario]:
+    from benchmarks.seed import PASSWORD, user_email
+
+    def auth(ctx, i, **kw):
+        kw["headers"] = {"Authorization": f"Bearer {ctx['tokens'][i % len(ctx['tokens'])]}"}
+        return kw
+
+    def group(ctx, i):
+        return ctx["groups"][i % len(ctx["groups"])]
+
+    return [
+        Scenario("GET /health", "GET", lambda ctx, i: {"url": "/health"}),
+        Scenario("GET /health/pool", "GET", lambda ctx, i: {"url": "/health/pool"}),
+        Scenario("GET /metrics", "GET", lambda ctx, i: {"url": "/metrics"}),
+        Scenario("POST /auth/register", "POST", lambda ctx, i: {"url": "/auth/register", "json": {
+            "username": f"new{ctx['run']}_{i}", "email": f"new{ctx['run']}_{i}@example.com", "password": PASSWORD,
+        }}),
+        Scenario("POST /auth/login", "POST", lambda ctx, i: {"url": "/auth/login", "data": {
+            "username": user_email(i % len(ctx["tokens"])), "password": PASSWORD,
+        }}),
+        Scenario("POST /auth/refresh", "POST", lambda ctx, i: {"url": "/auth/refresh", "json": {
+            "token": ctx["refresh"][i % len(ctx["refresh"])],
+        }}),
+        Scenario("GET /auth/me", "GET", lambda ctx, i: auth(ctx, i, url="/auth/me")),
+        Scenario("GET /challenges", "GET", lambda ctx, i: {"url": "/challenges", "params": dict(zip(
+            ("pillar", "energy_level"), group(ctx, i)))}),
+        Scenario("GET /challenges/next", "GET", lambda ctx, i: auth(ctx, i, url="/challenges/next", params=dict(zip(
+            ("pillar", "energy_level"), group(ctx, i))))),
+        Scenario("POST /challenges/{id}/complete", "POST", lambda ctx, i: auth(
+            ctx, i, url=f"/challenges/{ctx['challenge_ids'][i % len(ctx['challenge_ids'])]}/complete")),
+        Scenario("POST /sessions", "POST", lambda ctx, i: auth(ctx, i, url="/sessions", json={
+            "challenge_id": ctx["challenge_ids"][i % len(ctx["challenge_ids"])], "duration_seconds": 300,
+            "intensity": "MEDIUM",
+        })),
+        Scenario("POST /sessions/batch", "POST", lambda ctx, i: auth(ctx, i, url="/sessions/batch", json={"sessions": [
+            {"challenge_id": ctx["challenge_ids"][(i + n) % len(ctx["challenge_ids"])], "duration_seconds": 300,
+             "idempotency_key": f"bench{ctx['run']}_{i}_{n}"}
+            for n in range(50)
+        ]})),
+        Scenario("GET /activity/recent", "GET", lambda ctx, i: auth(ctx, i, url="/activity/recent")),
+        Scenario("GET /progress/summary", "GET", lambda ctx, i: auth(ctx, i, url="/progress/summary")),
+        Scenario("GET /progress/breakdown", "GET", lambda ctx, i: auth(ctx, i, url="/progress/breakdown")),
+        Scenario("GET /progress/calendar", "GET", lambda ctx, i: auth(ctx, i, url="/progress/calendar")),
+        Scenario("GET /progress/calendar?format=levels (year)", "GET", lambda ctx, i: auth(
+            ctx, i, url="/progress/calendar", params={"format": "levels", "to": datetime.utcnow().date().isoformat()})),
+        Scenario("GET /progress/dashboard", "GET", lambda ctx, i: auth(ctx, i, url="/progress/dashboard")),
+        Scenario("GET /progress/weekly", "GET", lambda ctx, i: auth(ctx, i, url="/progress/weekly")),
+        Scenario("GET /progress/monthly", "GET", lambda ctx, i: auth(ctx, i, url="/progress/monthly")),
+        Scenario("GET /progress/yearly", "GET", lambda ctx, i: auth(ctx, i, url="/progress/yearly")),
+        Scenario("GET /progress/histogram", "GET", lambda ctx, i: auth(
+            ctx, i, url="/progress/histogram", params={"granularity": "month"})),
+        Scenario("GET /leaderboard", "GET", lambda ctx, i: auth(ctx, i, url="/leaderboard")),
+        Scenario("GET /leaderboard?period=week", "GET", lambda ctx, i: auth(
+            ctx, i, url="/leaderboard", params={"period": "week"})),
+        Scenario("GET /export/sessions", "GET", lambda ctx, i: auth(ctx, i, url="/export/sessions")),
+        Scenario("GET /export/sessions?format=csv", "GET", lambda ctx, i: auth(
+            ctx, i, url="/export/sessions", params={"format": "csv"})),
+    ]
+
+
+async def _prepare(users: int) -> dict:
+    """Tokens for the seeded users and the catalog, fetched once before timing."""
+    from sqlalchemy import select
+
+    from app.auth import create_access_token, create_refresh_token
+    from app.database import AsyncSessionLocal
+    from app.models import Challenge, User
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(User.id, User.email, User.token_version).order_by(User.id).limit(users))).all()
+        challenges = (await db.execute(select(Challenge.id, Challenge.pillar, Challenge.energy_level))).all()
+    return {
+        "run": int(time.time()),
+        # Shared across scenarios and levels so generated usernames never collide
+        "seq": itertools.count(),
+        "tokens": [create_access_token(email, uid, tv) for uid, email, tv in rows],
+        "refresh": [create_refresh_token(email, uid, tv) for uid, email, tv in rows],
+        "challenge_ids": [c.id for c in challenges],
+        "groups": sorted({(c.pillar, c.energy_level) for c in challenges}),
+    }
+
+
+async def _run(client, scenario: Scenario, ctx: dict, requests: int, concurrency: int, warmup: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+
+    async def one(record: bool):
+        nonlocal errors
+        i = next(ctx["seq"])
+        kw = scenario.build(ctx, i)
+        async with sem:
+            _queries.set([0])
+            t = time.perf_counter()
+            r = await client.request(scenario.method, **kw)
+            elapsed = time.perf_counter() - t
+        if r.status_code not in scenario.expect:
+            errors += 1
+        if record:
+            latencies.append(elapsed)
+            queries.append(_queries.get()[0])
+
+    await asyncio.gather(*(one(False) for _ in range(warmup)))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(True) for _ in range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "endpoint": scenario.name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "req_per_sec": round(requests / wall, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+        "max_queries": max(queries),
+    }
+
+
+async def bench(args) -> dict:
+    import httpx
+    from sqlalchemy import event
+
+    from app import config
+    from app.auth import password_pool
+    from app.database import async_engine, engine
+    from app.main import app
+    from benchmarks.seed import seed
+
+    info = seed(engine, users=args.users, sessions_per_user=args.sessions_per_user,
+                completions_per_user=args.completions_per_user, challenges_per_group=args.challenges_per_group)
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+    results = []
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            ctx = await _prepare(args.users)
+            for scenario in scenarios():
+                if args.only and not any(o in scenario.name for o in args.only):
+                    continue
+                requests = args.login_requests if "/auth/" in scenario.name and "/me" not in scenario.name else args.requests
+                for concurrency in args.concurrency:
+                    r = await _run(client, scenario, ctx, requests, concurrency, args.warmup)
+                    results.append(r)
+                    print(f"{r['endpoint']:<34} c={concurrency:<4} p50={r['p50_ms']:>8}ms p95={r['p95_ms']:>8}ms "
+                          f"p99={r['p99_ms']:>8}ms {r['req_per_sec']:>8} req/s q/req={r['queries_per_request']}"
+                          + (f" errors={r['errors']}" if r["errors"] else ""), file=sys.stderr)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", _count)
+        await async_engine.dispose()
+        engine.dispose()
+        password_pool.shutdown()
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "dialect": engine.dialect.name,
+            "pool_mode": config.DB_POOL_MODE,
+            "python": platform.python_version(),
+            "argon2": {"time_cost": config.ARGON2_TIME_COST, "memory_cost": config.ARGON2_MEMORY_COST,
+                       "parallelism": config.ARGON2_PARALLELISM},
+            "users": args.users,
+            "sessions_per_user": args.sessions_per_user,
+            "completions_per_user": args.completions_per_user,
+            "challenges_per_group": args.challenges_per_group,
+            "seeded": info["seeded"],
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Print p95 latency and query-count changes per (endpoint, concurrency)."""
+    old = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"baseline {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    print(f"{'endpoint':<34} {'c':>4} {'p95 ms':>18} {'q/req':>12}")
+    for r in current["results"]:
+        b = old.get((r["endpoint"], r["concurrency"]))
+        if b is None:
+            continue
+        change = (r["p95_ms"] - b["p95_ms"]) / b["p95_ms"] * 100 if b["p95_ms"] else 0.0
+        print(f"{r['endpoint']:<34} {r['concurrency']:>4} {b['p95_ms']:>7}->{r['p95_ms']:<7}{change:+5.0f}% "
+              f"{b['queries_per_request']:>5}->{r['queries_per_request']:<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="scratch database URL (or BENCH_DATABASE_URL); default: temporary SQLite file")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--sessions-per-user", type=int, default=100)
+    parser.add_argument("--completions-per-user", type=int, default=20)
+    parser.add_argument("--challenges-per-group", type=int, default=20)
+    parser.add_argument("--concurrency", default="1,10", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint and level")
+    parser.add_argument("--login-requests", type=int, default=20, help="timed requests for Argon2-bound auth routes")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", action="append", help="run endpoints whose name contains this (repeatable)")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    tmp = None
+    if not args.url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        args.url = f"sqlite:///{tmp.name}"
+    # app.config reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.url
+    try:
+        report = asyncio.run(bench(args))
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
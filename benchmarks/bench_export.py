@@ -0,0 +1,143 @@
+"""
+Memory and throughput of the streaming ``/export/sessions`` endpoint.
+
+For each history size a child process (the app binds its engines at import
+time) seeds one user into a fresh SQLite file (``benchmarks.seed``) and
+drives the ASGI app directly, discarding body chunks as they arrive so only
+the app's own memory is measured. Every format runs with and without gzip,
+reporting bytes, chunks, time and peak Python heap (``tracemalloc``):
+
+    python -m benchmarks.bench_export [--sizes 2000,40000] [--max-growth 1.5] [--json]
+
+Fails (exit 1) if the peak heap at the largest size exceeds ``--max-growth``
+times the peak at the smallest, i.e. if memory grows with history length.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+MAX_GROWTH = 1.5
+
+
+async def _export(app, token: str, fmt: str, use_gzip: bool) -> dict:
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    headers.append((b"accept-encoding", b"gzip" if use_gzip else b"identity"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/export/sessions", "raw_path": b"/export/sessions", "root_path": "",
+        "query_string": urlencode({"format": fmt}).encode(), "headers": headers,
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    finished = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    out = {"format": fmt, "gzip": use_gzip, "status": None, "bytes": 0, "chunks": 0}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            out["bytes"] += len(message["body"])
+            out["chunks"] += 1
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    out["ms"] = (time.perf_counter() - start) * 1000
+    out["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+    finished.set()
+    return out
+
+
+async def _measure(sessions: int) -> list[dict]:
+    from app.database import async_engine, engine
+    from app.export import FORMATS
+    from app.main import app
+    from benchmarks.bench_endpoints import _prepare
+    from benchmarks.seed import seed
+
+    seed(engine, users=1, sessions_per_user=sessions, completions_per_user=0)
+    try:
+        ctx = await _prepare(1)
+        # Warm-up: imports, catalog, first connection
+        await _export(app, ctx["tokens"][0], "ndjson", False)
+        tracemalloc.start()
+        results = []
+        for fmt in FORMATS:
+            for use_gzip in (False, True):
+                results.append(dict(await _export(app, ctx["tokens"][0], fmt, use_gzip), sessions=sessions))
+        tracemalloc.stop()
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+    return results
+
+
+def _child(sessions: int) -> list[dict]:
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp.name}")
+    env.setdefault("ARGON2_TIME_COST", "1")
+    env.setdefault("ARGON2_MEMORY_COST", "8192")
+    env.setdefault("ARGON2_PARALLELISM", "1")
+    try:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--child", str(sessions)],
+                              env=env, capture_output=True, text=True)
+    finally:
+        os.unlink(tmp.name)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"{sessions} sessions: measurement failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="2000,40000", help="comma-separated session counts")
+    parser.add_argument("--max-growth", type=float, default=MAX_GROWTH)
+    parser.add_argument("--json", action="store_true", help="emit the results as JSON")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args.child))))
+        return
+
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    results = [r for size in sizes for r in _child(size)]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'sessions':>8} {'format':<7} {'gzip':<5} {'bytes':>10} {'chunks':>6} {'ms':>8} {'peak KiB':>9}")
+        for r in results:
+            print(f"{r['sessions']:>8} {r['format']:<7} {str(r['gzip']):<5} {r['bytes']:>10} {r['chunks']:>6} "
+                  f"{r['ms']:>8.1f} {r['peak_kib']:>9.1f}")
+
+    problems = [f"{r['sessions']} sessions {r['format']}: status {r['status']}" for r in results if r["status"] != 200]
+    for small in (r for r in results if r["sessions"] == sizes[0]):
+        large = next(r for r in results if r["sessions"] == sizes[-1]
+                     and (r["format"], r["gzip"]) == (small["format"], small["gzip"]))
+        if large["peak_kib"] > args.max_growth * small["peak_kib"]:
+            problems.append(f"{small['format']} gzip={small['gzip']}: peak {small['peak_kib']:.0f} KiB at "
+                            f"{sizes[0]} sessions, {large['peak_kib']:.0f} KiB at {sizes[-1]}")
+    for p in problems:
+        print(f"FAIL {p}", file=sys.stderr)
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
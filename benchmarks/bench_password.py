@@ -0,0 +1,93 @@
+"""
+Login throughput for different Argon2 cost settings and hashing pool sizes.
+
+Drives ``auth.PasswordHashPool.verify`` (the login hot path) with a fixed
+number of concurrent callers and reports logins/sec and latency percentiles:
+
+    python -m benchmarks.bench_password --logins 64 --concurrency 16 \
+        --costs 1:19456,2:19456,3:65536 --workers 1,2,4 [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from argon2 import PasswordHasher  # noqa: E402
+
+from app.auth import PasswordHashPool  # noqa: E402
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(pct / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+async def _run(pool: PasswordHashPool, hashed: str, logins: int, concurrency: int) -> list[float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one():
+        async with sem:
+            t = time.perf_counter()
+            ok = await pool.verify("correct horse battery staple", hashed)
+            latencies.append(time.perf_counter() - t)
+            assert ok
+
+    await asyncio.gather(*(one() for _ in range(logins)))
+    return latencies
+
+
+def bench(time_cost: int, memory_cost: int, parallelism: int, workers: int, logins: int, concurrency: int) -> dict:
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    hashed = hasher.hash("correct horse battery staple")
+    pool = PasswordHashPool(hasher, workers, max_pending=logins)
+    try:
+        start = time.perf_counter()
+        latencies = asyncio.run(_run(pool, hashed, logins, concurrency))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "workers": workers,
+        "logins": logins,
+        "concurrency": concurrency,
+        "logins_per_sec": round(logins / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "min_ms": round(min(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--costs", default="1:19456,2:19456,3:65536", help="time_cost:memory_cost_kib pairs")
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    parser.add_argument("--json", action="store_true", help="emit one JSON object per line")
+    args = parser.parse_args()
+
+    costs = [tuple(int(x) for x in c.split(":")) for c in args.costs.split(",")]
+    workers = sorted({int(w) for w in args.workers.split(",")})
+    if not args.json:
+        print(f"{'t':>3} {'m(KiB)':>8} {'workers':>7} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for time_cost, memory_cost in costs:
+        for w in workers:
+            r = bench(time_cost, memory_cost, args.parallelism, w, args.logins, args.concurrency)
+            if args.json:
+                print(json.dumps(r))
+            else:
+                print(f"{time_cost:>3} {memory_cost:>8} {w:>7} {r['logins_per_sec']:>9} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-request connection cost under each pooling mode.
+
+Runs the same short transaction (auth-style primary-key lookup plus an
+aggregate) through an async engine built with ``app.database.engine_options``
+for every mode, and reports latency and throughput. Point it at a local
+Postgres to see the handshake cost NullPool pays on every request:
+
+    python -m benchmarks.bench_pool --url postgresql://postgres@localhost/bench \
+        --requests 500 --concurrency 20 [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+
+from app.config import _async_url, _normalize_pg_url  # noqa: E402
+from app.database import engine_options  # noqa: E402
+
+QUERIES = [
+    text("SELECT 1"),
+    text("SELECT count(*) FROM generate_series(1, 100) AS g WHERE g > :n"),
+]
+
+VARIANTS = [
+    ("null", None),
+    ("queue", None),
+    ("queue", 5),
+    ("queue", 0),
+]
+
+
+async def _run(url: str, mode: str, prepare_threshold: int | None, requests: int, concurrency: int) -> dict:
+    eng = create_async_engine(url, **engine_options(url, mode, is_async=True, prepare_threshold=prepare_threshold))
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int):
+        async with sem:
+            t = time.perf_counter()
+            async with eng.connect() as conn:
+                await conn.execute(QUERIES[0])
+                await conn.execute(QUERIES[1], {"n": i % 50})
+            latencies.append(time.perf_counter() - t)
+
+    try:
+        async with eng.connect() as conn:  # warm-up, and fail fast on a bad URL
+            await conn.execute(QUERIES[0])
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await eng.dispose()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "prepare_threshold": prepare_threshold,
+        "requests": requests,
+        "concurrency": concurrency,
+        "req_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=os.environ.get("BENCH_DATABASE_URL"), help="Postgres URL (or BENCH_DATABASE_URL)")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="emit one JSON object per line")
+    args = parser.parse_args()
+    if not args.url:
+        parser.error("--url or BENCH_DATABASE_URL is required (a local Postgres)")
+    url = _async_url(_normalize_pg_url(args.url))
+
+    if not args.json:
+        print(f"{'mode':<6} {'prepare':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, prepare in VARIANTS:
+        r = asyncio.run(_run(url, mode, prepare, args.requests, args.concurrency))
+        if args.json:
+            print(json.dumps(r))
+        else:
+            print(f"{mode:<6} {str(prepare):>7} {r['req_per_sec']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
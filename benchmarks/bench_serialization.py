@@ -0,0 +1,158 @@
+"""
+Per-response JSON encoding cost: FastAPI's default path versus the
+``app.responses.json_response`` path the routes use.
+
+For each representative payload (built in memory, no database) it times:
+
+- ``dict``: the pre-change route path; plain dicts through ``jsonable_encoder``
+  and ``JSONResponse`` (``json.dumps``)
+- ``response_model``: returning the model and letting FastAPI validate and
+  serialize it against the route's ``response_model`` (rendered with the
+  app's default ``ORJSONResponse``)
+- ``json_response``: a cached ``TypeAdapter`` dumping the model to bytes
+
+    python -m benchmarks.bench_serialization [--items 100] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app.histogram import buckets, shape  # noqa: E402
+from app.main import app  # noqa: E402
+from app.progress import breakdown_section, calendar_days, calendar_levels, calendar_section, weekly_section  # noqa: E402
+from app.responses import ORJSONResponse, json_response  # noqa: E402
+from app.schemas import (  # noqa: E402
+    ActivityItem,
+    ActivityPage,
+    ChallengePage,
+    DashboardOut,
+    HistogramOut,
+    NextChallengeOut,
+    SummaryOut,
+)
+
+MIN_SECONDS = 0.2
+
+
+def payloads(items: int) -> dict:
+    """(route path, model instance, dump kwargs) per payload name."""
+    rng = random.Random(7)
+    today = date.today()
+    challenges = [
+        {
+            "id": i, "pillar": "Mind", "energy_level": "LOW", "number": i, "name": f"Challenge {i}",
+            "duration_minutes": 10, "description": "Sit comfortably and breathe. " * 4,
+            "steps": [f"Step {n} of challenge {i}" for n in range(5)],
+        }
+        for i in range(1, items + 1)
+    ]
+    activity = ActivityPage(items=[
+        ActivityItem(
+            id=i, challenge_id=rng.randint(1, 50), title=f"Challenge {i % 50}",
+            started_at=datetime(2024, 1, 1) + timedelta(minutes=37 * i), duration_minutes=rng.randint(1, 60),
+            intensity="MEDIUM", points=rng.randint(1, 180),
+        )
+        for i in range(items)
+    ], next_cursor="MjAyNC0wMS0wMVQwMDowMDowMHwx")
+    day_minutes = {today.replace(day=d): rng.randint(0, 40) for d in range(1, 29)}
+    year_start = date(today.year, 1, 1)
+    spans = buckets("day", year_start, year_start + timedelta(days=365))
+    year = shape(spans, {b.key: rng.randint(0, 5) for b in spans})
+    year_end = year_start + timedelta(days=365)
+    year_minutes = {year_start + timedelta(days=d): rng.choice([0, 0, 10, 30]) for d in range(365)}
+    dashboard = DashboardOut(
+        summary=SummaryOut(completed_count=42, total_minutes=1234, streak_days=5, points=2468),
+        breakdown=breakdown_section([("Body", 40, 600), ("Mind", 30, 450), ("Social", 10, 100), ("Spirit", 5, 84)]),
+        calendar=calendar_section(day_minutes, today.year, today.month),
+        weekly=weekly_section({today: 3}, today),
+        recent=ActivityPage(items=activity.items[:20], next_cursor=activity.next_cursor),
+    )
+    return {
+        f"challenges page ({items})": ("/challenges", ChallengePage(items=challenges), {}),
+        "next challenge": ("/challenges/next", NextChallengeOut(item=challenges[0]), {}),
+        f"activity page ({items})": ("/activity/recent", activity, {}),
+        "calendar (month)": ("/progress/calendar", calendar_section(day_minutes, today.year, today.month), {}),
+        "calendar (year, days)": ("/progress/calendar", calendar_days(year_minutes, year_start, year_end), {}),
+        "calendar (year, levels)": ("/progress/calendar", calendar_levels(year_minutes, year_start, year_end), {}),
+        "histogram (365 days)": ("/progress/histogram", HistogramOut(granularity="day", items=year), {}),
+        "dashboard (all sections)": ("/progress/dashboard", dashboard, {"exclude_unset": True}),
+    }
+
+
+def _per_call(fn) -> float:
+    """Seconds per call, repeating until ``MIN_SECONDS`` have elapsed."""
+    fn()
+    n, elapsed = 1, 0.0
+    while elapsed < MIN_SECONDS:
+        n *= 2
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - start
+    return elapsed / n
+
+
+async def measure(items: int) -> list[dict]:
+    fields = {r.path: r.response_field for r in app.routes if getattr(r, "response_field", None) is not None}
+    results = []
+    for name, (path, model, dump_kwargs) in payloads(items).items():
+        plain = model.model_dump(**dump_kwargs)
+        field = fields[path]
+
+        async def response_model_call():
+            content = await serialize_response(field=field, response_content=model, is_coroutine=True,
+                                               exclude_unset=bool(dump_kwargs.get("exclude_unset")))
+            return ORJSONResponse(content).body
+
+        async def response_model_timed() -> float:
+            await response_model_call()
+            n, elapsed = 1, 0.0
+            while elapsed < MIN_SECONDS:
+                n *= 2
+                start = time.perf_counter()
+                for _ in range(n):
+                    await response_model_call()
+                elapsed = time.perf_counter() - start
+            return elapsed / n
+
+        before = JSONResponse(jsonable_encoder(plain)).body
+        after = json_response(model, **dump_kwargs).body
+        if json.loads(before) != json.loads(after):
+            raise SystemExit(f"{name}: json_response output differs from the dict path")
+        results.append({
+            "payload": name,
+            "bytes": len(after),
+            "dict_us": _per_call(lambda: JSONResponse(jsonable_encoder(plain)).body) * 1e6,
+            "response_model_us": await response_model_timed() * 1e6,
+            "json_response_us": _per_call(lambda: json_response(model, **dump_kwargs).body) * 1e6,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100, help="items in the list payloads")
+    parser.add_argument("--json", action="store_true", help="emit the results as JSON")
+    args = parser.parse_args()
+    results = asyncio.run(measure(args.items))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'payload':<26} {'bytes':>7} {'dict us':>9} {'model us':>9} {'json_response us':>17} {'speedup':>8}")
+    for r in results:
+        print(f"{r['payload']:<26} {r['bytes']:>7} {r['dict_us']:>9.1f} {r['response_model_us']:>9.1f} "
+              f"{r['json_response_us']:>17.1f} {r['dict_us'] / r['json_response_us']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Per-route SQL statement budgets, checked against seeded data of several sizes.
+
+Every route in ``app.main`` declares ``@query_budget(n)``. For each dataset
+size this script seeds a fresh SQLite file in a child process (the app binds
+its engines at import time), runs each endpoint scenario from
+``benchmarks.bench_endpoints`` with cold and warm caches under
+``APP_ENV=test`` (so an over-budget statement raises), and records the most
+statements any request issued:
+
+    python -m benchmarks.check_query_budgets [--json]
+
+Fails (exit 1) if a route exceeds its budget, has no budget, or issues a
+different number of statements as the data grows.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# name: (users, sessions per user, completions per user, challenges per pillar/energy level)
+SIZES = {
+    "small": (3, 5, 2, 3),
+    "large": (3, 1500, 40, 60),
+}
+CALLS_PER_SCENARIO = 3
+
+
+async def _measure(size: str) -> dict:
+    import httpx
+    from sqlalchemy import insert, select
+
+    from app.auth import _user_cache
+    from app.catalog import catalog
+    from app.leaderboard import _top_cache
+    from app.database import async_engine, engine
+    from app.main import app
+    from app.metrics import QueryBudgetExceeded, registry
+    from app.models import Challenge, ChallengeCompletion, ChallengeCursor, User, UserProgress
+    from benchmarks.bench_endpoints import Scenario, _prepare, scenarios
+    from benchmarks.seed import seed
+
+    users, sessions, completions, challenges = SIZES[size]
+    seed(engine, users=users, sessions_per_user=sessions, completions_per_user=completions,
+         challenges_per_group=challenges)
+
+    def wrap_cycle(ctx):
+        # Leave one Mind/LOW challenge open for the last seeded user; completing it starts a new cycle
+        with engine.begin() as conn:
+            uid = conn.scalar(select(User.id).order_by(User.id).offset(users - 1).limit(1))
+            conn.execute(ChallengeCursor.__table__.delete().where(ChallengeCursor.user_id == uid))
+            conn.execute(ChallengeCompletion.__table__.delete().where(ChallengeCompletion.user_id == uid))
+            rows = conn.execute(select(Challenge.id, Challenge.pillar, Challenge.energy_level).where(
+                Challenge.pillar == "Mind", Challenge.energy_level == "LOW").order_by(Challenge.number)).all()
+            conn.execute(insert(ChallengeCompletion), [
+                {"user_id": uid, "challenge_id": cid, "pillar": p, "energy_level": e} for cid, p, e in rows[:-1]
+            ])
+        ctx["wrap_id"] = rows[-1].id
+
+    cases = scenarios() + [Scenario("POST /challenges/{id}/complete (new cycle)", "POST", lambda ctx, i: {
+        "url": f"/challenges/{ctx['wrap_id']}/complete",
+        "headers": {"Authorization": f"Bearer {ctx['tokens'][-1]}"},
+    })]
+    out = {"routes": {}, "violations": []}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+            ctx = await _prepare(users)
+            budgets = {(m, r.path): getattr(r.endpoint, "query_budget", None)
+                       for r in app.routes for m in getattr(r, "methods", ())}
+            for case in cases:
+                for i in range(CALLS_PER_SCENARIO):
+                    if i == 0:
+                        # Cold: nothing cached in this process, progress rows and cursors not yet created
+                        catalog.invalidate()
+                        _user_cache.clear()
+                        _top_cache.clear()
+                        with engine.begin() as conn:
+                            conn.execute(UserProgress.__table__.delete())
+                            conn.execute(ChallengeCursor.__table__.delete())
+                    if case.name.endswith("(new cycle)"):
+                        wrap_cycle(ctx)
+                    registry.reset()
+                    try:
+                        await client.request(case.method, **case.build(ctx, next(ctx["seq"])))
+                    except QueryBudgetExceeded as exc:
+                        out["violations"].append(f"{case.name}: {exc}")
+                    for (method, route), m in registry.snapshot().items():
+                        key = f"{method} {route}"
+                        entry = out["routes"].setdefault(key, {"budget": budgets.get((method, route)), "max": 0})
+                        entry["max"] = max(entry["max"], m["statements"])
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+    return out
+
+
+def _child(size: str) -> dict:
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp.name}", APP_ENV="test", QUERY_BUDGET_MODE="raise")
+    # Hash cost does not change query counts; keep seeding and logins fast
+    env.setdefault("ARGON2_TIME_COST", "1")
+    env.setdefault("ARGON2_MEMORY_COST", "8192")
+    env.setdefault("ARGON2_PARALLELISM", "1")
+    try:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.check_query_budgets", "--child", size],
+                              env=env, capture_output=True, text=True)
+    finally:
+        os.unlink(tmp.name)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"{size}: measurement failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", action="store_true", help="emit the per-size results as JSON")
+    parser.add_argument("--child", choices=SIZES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args.child))))
+        return
+
+    results = {size: _child(size) for size in SIZES}
+    problems = [v for r in results.values() for v in r["violations"]]
+    routes = sorted({route for r in results.values() for route in r["routes"]})
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'route':<42} {'budget':>6} " + " ".join(f"{size:>6}" for size in SIZES))
+    for route in routes:
+        entries = [results[size]["routes"].get(route) for size in SIZES]
+        budget = next((e["budget"] for e in entries if e), None)
+        counts = [e["max"] if e else None for e in entries]
+        if not args.json:
+            print(f"{route:<42} {str(budget):>6} " + " ".join(f"{str(c):>6}" for c in counts))
+        if budget is None:
+            problems.append(f"{route}: no @query_budget")
+        elif any(c is not None and c > budget for c in counts):
+            problems.append(f"{route}: {max(c for c in counts if c is not None)} statements, budget {budget}")
+        if len({c for c in counts if c is not None}) > 1:
+            problems.append(f"{route}: statement count grows with data size {counts}")
+    for p in problems:
+        print(f"FAIL {p}", file=sys.stderr)
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
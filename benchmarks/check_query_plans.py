@@ -0,0 +1,159 @@
+"""
+Query-plan regression check for the hot per-user queries.
+
+Seeds a scratch database (see ``benchmarks.seed``), runs ``ANALYZE``, then
+EXPLAINs each query the request path issues per user and fails if any of them
+scans a whole hot table instead of seeking an index:
+
+    python -m benchmarks.check_query_plans --url postgresql://postgres@localhost/plans \
+        [--users 500 --sessions-per-user 400] [--json]
+
+On Postgres a ``Seq Scan`` node on a hot table fails the check; on SQLite
+(the default, a temporary file) a ``SCAN`` step does. Exits 1 on failure.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+
+from app.activity import encode_cursor, recent_query  # noqa: E402
+from app.config import _normalize_pg_url  # noqa: E402
+from app.export import export_query  # noqa: E402
+from app.leaderboard import rank_query, top_query  # noqa: E402
+from app.models import ChallengeCompletion, ChallengeCursor, Session, User, UserDailyStat  # noqa: E402
+from app.rollups import week_start  # noqa: E402
+from benchmarks.seed import seed, user_email  # noqa: E402
+
+HOT_TABLES = {
+    "sessions", "challenge_completions", "challenge_cursors", "user_daily_stats", "users",
+    "user_progress", "user_weekly_points",
+}
+
+
+def hot_queries(user_id: int, mid: tuple[datetime, int]) -> dict:
+    """The per-user statements issued by the request path, keyed by name."""
+    today = datetime.utcnow().date()
+    return {
+        "login by email": select(User).where(User.email == user_email(0)).limit(1),
+        "activity first page": recent_query(user_id, 20),
+        "activity deep page": recent_query(user_id, 20, encode_cursor(*mid)),
+        "streak walk": select(Session.started_at).where(
+            Session.user_id == user_id,
+            Session.started_at < datetime.combine(today + timedelta(days=1), datetime.min.time()),
+        ).order_by(Session.started_at.desc()),
+        "export range": export_query(user_id, today - timedelta(days=90), today),
+        "batch idempotency keys": select(Session.id).where(
+            Session.user_id == user_id, Session.idempotency_key.in_(["k1", "k2"]),
+        ),
+        "next challenge cursor": select(ChallengeCursor).where(
+            ChallengeCursor.user_id == user_id,
+            ChallengeCursor.pillar == "Mind",
+            ChallengeCursor.energy_level == "LOW",
+        ),
+        "cursor advance completions": select(ChallengeCompletion.challenge_id).where(
+            ChallengeCompletion.user_id == user_id,
+            ChallengeCompletion.pillar == "Mind",
+            ChallengeCompletion.energy_level == "LOW",
+            ChallengeCompletion.cycle == 0,
+        ),
+        "daily stats range": select(UserDailyStat.day, func.sum(UserDailyStat.minutes)).where(
+            UserDailyStat.user_id == user_id,
+            UserDailyStat.day >= today - timedelta(days=31),
+            UserDailyStat.day < today,
+        ).group_by(UserDailyStat.day),
+        "leaderboard top": top_query("all", None, 10),
+        "leaderboard rank": rank_query("all", None, 100),
+        "weekly leaderboard top": top_query("week", week_start(today), 10),
+        "weekly leaderboard rank": rank_query("week", week_start(today), 100),
+    }
+
+
+def _explain(conn, stmt) -> list[str]:
+    """Plan steps as readable strings; hot-table full scans are prefixed with ``!``."""
+    compiled = stmt.compile(conn, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[k] for k in compiled.positiontup)
+    if conn.dialect.name == "postgresql":
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        steps = []
+
+        def walk(node, depth=0):
+            relation = node.get("Relation Name")
+            label = node["Node Type"] + (f" on {relation}" if relation else "")
+            if node.get("Index Name"):
+                label += f" using {node['Index Name']}"
+            bad = node["Node Type"] == "Seq Scan" and relation in HOT_TABLES
+            steps.append(("!" if bad else " ") + "  " * depth + label)
+            for child in node.get("Plans", []):
+                walk(child, depth + 1)
+
+        walk(plan[0]["Plan"])
+        return steps
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+    steps = []
+    for row in rows:
+        detail = row[-1]
+        words = detail.split()
+        bad = len(words) > 1 and words[0] == "SCAN" and words[1] in HOT_TABLES
+        steps.append(("!" if bad else " ") + detail)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=os.environ.get("PLAN_CHECK_DATABASE_URL"),
+                        help="scratch database URL (or PLAN_CHECK_DATABASE_URL); default: temporary SQLite file")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--sessions-per-user", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="emit one JSON object per query")
+    args = parser.parse_args()
+
+    tmp = None
+    url = args.url
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        url = f"sqlite:///{tmp.name}"
+    engine = create_engine(_normalize_pg_url(url))
+    try:
+        info = seed(engine, users=args.users, sessions_per_user=args.sessions_per_user)
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+            user_id = conn.scalar(select(Session.user_id).limit(1))
+            mid = conn.execute(
+                select(Session.started_at, Session.id).where(Session.user_id == user_id)
+                .order_by(Session.started_at.desc(), Session.id.desc()).offset(args.sessions_per_user // 2).limit(1)
+            ).one()
+            failures = 0
+            if not args.json:
+                print(f"{engine.dialect.name}: {info}")
+            for name, stmt in hot_queries(user_id, tuple(mid)).items():
+                steps = _explain(conn, stmt)
+                ok = not any(s.startswith("!") for s in steps)
+                failures += not ok
+                if args.json:
+                    print(json.dumps({"query": name, "ok": ok, "plan": [s[1:] for s in steps]}))
+                else:
+                    print(f"{'ok  ' if ok else 'FAIL'} {name}")
+                    for s in steps:
+                        print(f"       {s}")
+    finally:
+        engine.dispose()
+        if tmp is not None:
+            os.unlink(tmp.name)
+    if failures:
+        print(f"{failures} hot queries fall back to a full table scan", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Read-replica routing check, with two local SQLite files standing in for the
+primary and the replica.
+
+The replica is a snapshot copy of the seeded primary opened read-only
+(``mode=ro``), so it never catches up: any write that should be visible must
+be read from the primary, and any write on the read path fails. Users'
+progress rows and challenge cursors are removed before the copy, so the
+computed fallbacks are exercised. In a child process (the app binds its engines at
+import time) it checks that:
+
+- every GET endpoint scenario of ``benchmarks.bench_endpoints`` succeeds and
+  runs its statements on the replica only;
+- replica answers for missing progress rows and cursors match the primary's;
+- writes run on the primary, and the writer's next reads see them, through
+  the ``last_write`` cookie and through the in-process pin alike;
+- once ``READ_YOUR_WRITES_SECONDS`` has passed, reads go back to the replica.
+
+    python -m benchmarks.check_read_replica [--json]
+
+Exits 1 if any check fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+READ_YOUR_WRITES_SECONDS = 1.0
+USERS = 3
+
+
+async def _check() -> list[dict]:
+    import httpx
+    from sqlalchemy import event
+
+    from app.database import async_engine, async_read_engine, engine
+    from app.main import app
+    from app.replica import LAST_WRITE_COOKIE
+    from benchmarks.bench_endpoints import _prepare, scenarios
+
+    statements: Counter = Counter()
+    for name, eng in (("primary", async_engine.sync_engine), ("replica", async_read_engine.sync_engine)):
+        event.listen(eng, "before_cursor_execute", lambda *a, name=name: statements.update([name]))
+
+    results = []
+
+    def record(check: str, ok: bool, **detail):
+        results.append({"check": check, "ok": bool(ok), **detail})
+
+    async def call(client, method: str, **request) -> tuple[httpx.Response, dict]:
+        statements.clear()
+        r = await client.request(method, **request)
+        return r, {"primary": statements["primary"], "replica": statements["replica"]}
+
+    def headers(token: str) -> dict:
+        return {"Authorization": f"Bearer {token}"}
+
+    try:
+        # Failed requests (e.g. a write on the read-only replica) come back as 500s, not exceptions
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replica") as client:
+            ctx = await _prepare(USERS)
+            reader, writer = ctx["tokens"][0], ctx["tokens"][1]
+
+            for case in scenarios():
+                if case.method != "GET":
+                    continue
+                # Every scenario reads as the first user, who never writes here
+                request = case.build(ctx, 0)
+                r, used = await call(client, case.method, **request)
+                record(f"{case.name} reads the replica", r.status_code in case.expect and used["primary"] == 0,
+                       status=r.status_code, **used)
+
+            for url, params, key in [
+                ("/progress/summary", None, None),
+                ("/challenges/next", dict(zip(("pillar", "energy_level"), ctx["groups"][0])), None),
+                ("/leaderboard", None, "me"),
+            ]:
+                replica, _ = await call(client, "GET", url=url, params=params, headers=headers(reader))
+                client.cookies.set(LAST_WRITE_COOKIE, f"{time.time():.3f}")
+                primary, used = await call(client, "GET", url=url, params=params, headers=headers(reader))
+                client.cookies.clear()
+                if replica.status_code != 200 or primary.status_code != 200:
+                    record(f"{url} on the replica matches the primary", False,
+                           status=[replica.status_code, primary.status_code])
+                    continue
+                a, b = replica.json(), primary.json()
+                if key:
+                    a, b = a[key], b[key]
+                record(f"{url} on the replica matches the primary", a == b and used["replica"] == 0,
+                       replica=a, primary=b)
+
+            r, used = await call(client, "POST", url="/sessions", headers=headers(writer), json={
+                "challenge_id": ctx["challenge_ids"][0], "duration_seconds": 600,
+            })
+            created = r.json().get("id")
+            record("POST /sessions writes the primary", r.status_code == 200 and used["replica"] == 0,
+                   status=r.status_code, **used)
+
+            async def sees_write() -> tuple[bool, dict]:
+                page, used = await call(client, "GET", url="/activity/recent", headers=headers(writer))
+                return any(item["id"] == created for item in page.json()["items"]), used
+
+            seen, used = await sees_write()
+            record("writer reads its write (cookie)", seen and used["replica"] == 0, **used)
+            client.cookies.clear()
+            seen, used = await sees_write()
+            record("writer reads its write (in-process pin)", seen and used["replica"] == 0, **used)
+
+            await asyncio.sleep(READ_YOUR_WRITES_SECONDS + 0.1)
+            seen, used = await sees_write()
+            # The snapshot replica never receives the write, so seeing it would mean a primary read
+            record("reads return to the replica after the window", not seen and used["primary"] == 0, **used)
+    finally:
+        await async_engine.dispose()
+        await async_read_engine.dispose()
+        engine.dispose()
+    return results
+
+
+def _seed(path: str) -> None:
+    from sqlalchemy import create_engine
+
+    from app.models import ChallengeCursor, UserProgress
+    from benchmarks.seed import seed
+
+    eng = create_engine(f"sqlite:///{path}")
+    try:
+        seed(eng, users=USERS, sessions_per_user=30, completions_per_user=3, challenges_per_group=3)
+        with eng.begin() as conn:
+            conn.execute(UserProgress.__table__.delete())
+            conn.execute(ChallengeCursor.__table__.delete())
+    finally:
+        eng.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", action="store_true", help="emit the results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(asyncio.run(_check())))
+        return
+
+    tmp = tempfile.mkdtemp()
+    primary, replica = os.path.join(tmp, "primary.db"), os.path.join(tmp, "replica.db")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{primary}",
+        DATABASE_READ_URL=f"sqlite:///file:{replica}?mode=ro&uri=true",
+        READ_YOUR_WRITES_SECONDS=str(READ_YOUR_WRITES_SECONDS),
+        APP_ENV="test",
+    )
+    # Hash cost is irrelevant here; keep seeding fast
+    env.setdefault("ARGON2_TIME_COST", "1")
+    env.setdefault("ARGON2_MEMORY_COST", "8192")
+    env.setdefault("ARGON2_PARALLELISM", "1")
+    try:
+        subprocess.run([sys.executable, "-c", f"from benchmarks.check_read_replica import _seed; _seed({primary!r})"],
+                       env=env, check=True)
+        shutil.copyfile(primary, replica)
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.check_read_replica", "--child"],
+                              env=env, capture_output=True, text=True)
+    finally:
+        shutil.rmtree(tmp)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit("replica check failed to run")
+    results = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            detail = {k: v for k, v in r.items() if k not in ("check", "ok")}
+            print(f"{'ok  ' if r['ok'] else 'FAIL'} {r['check']}" + (f"  {detail}" if not r["ok"] else ""))
+    failures = sum(not r["ok"] for r in results)
+    if failures:
+        print(f"{failures} replica routing checks failed", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
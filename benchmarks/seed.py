@@ -0,0 +1,88 @@
+"""
+Deterministic synthetic data for the benchmark and check scripts.
+
+Creates the schema (``create_all`` plus ``app.migrations``) and fills it with
+users, a challenge catalog, a year of sessions, completions and the matching
+rollups (``user_daily_stats``, ``user_weekly_points``, ``user_progress``).
+Seeding is skipped when ``sessions`` already has rows, so the scripts can
+also run against a copy of real data.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as DBSession
+
+from app.auth import hash_password
+from app.database import Base
+from app.migrations import upgrade
+from app.models import Challenge, ChallengeCompletion, Session, User
+from app.rollups import backfill
+
+PILLARS = ["Mind", "Body", "Spirit", "Social"]
+ENERGY_LEVELS = ["LOW", "MEDIUM", "HIGH"]
+CHALLENGES_PER_GROUP = 20
+INTENSITIES = ["LOW", "MEDIUM", "HIGH"]
+PASSWORD = "bench-password"
+CHUNK = 5000
+
+
+def _chunks(rows: list[dict], size: int = CHUNK):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def user_email(i: int) -> str:
+    return f"bench{i}@example.com"
+
+
+def seed(engine: Engine, users: int = 200, sessions_per_user: int = 200, completions_per_user: int = 30,
+         challenges_per_group: int = CHALLENGES_PER_GROUP, rng_seed: int = 0) -> dict:
+    """Create the schema and seed it; returns row counts."""
+    Base.metadata.create_all(bind=engine)
+    upgrade(engine)
+    with DBSession(engine) as db:
+        existing = db.scalar(select(func.count(Session.id)))
+        if existing:
+            return {"seeded": False, "sessions": existing}
+
+        rng = random.Random(rng_seed)
+        # One hash for every user: Argon2 would otherwise dominate seeding time
+        hashed = hash_password(PASSWORD)
+        db.execute(insert(User), [
+            {"username": f"bench{i}", "email": user_email(i), "hashed_password": hashed}
+            for i in range(users)
+        ])
+        db.execute(insert(Challenge), [
+            {
+                "pillar": p, "energy_level": e, "number": n, "name": f"{p} {e} #{n}",
+                "duration_minutes": 5, "description": "Synthetic challenge",
+            }
+            for p in PILLARS for e in ENERGY_LEVELS for n in range(1, challenges_per_group + 1)
+        ])
+        user_ids = list(db.scalars(select(User.id).order_by(User.id)))
+        challenges = db.execute(select(Challenge.id, Challenge.pillar, Challenge.energy_level)).all()
+
+        now = datetime.utcnow().replace(microsecond=0)
+        sessions = []
+        completions = []
+        for uid in user_ids:
+            for _ in range(sessions_per_user):
+                cid, pillar, energy = rng.choice(challenges)
+                started = now - timedelta(seconds=rng.randrange(365 * 86400))
+                seconds = rng.randrange(60, 1800)
+                sessions.append({
+                    "user_id": uid, "challenge_id": cid, "pillar": pillar, "energy_level": energy,
+                    "started_at": started, "ended_at": started + timedelta(seconds=seconds),
+                    "duration_seconds": seconds, "intensity": rng.choice(INTENSITIES), "points": seconds // 60 * 10,
+                })
+            for cid, pillar, energy in rng.sample(challenges, min(completions_per_user, len(challenges))):
+                completions.append({"user_id": uid, "challenge_id": cid, "pillar": pillar, "energy_level": energy})
+        for chunk in _chunks(sessions):
+            db.execute(insert(Session), chunk)
+        for chunk in _chunks(completions):
+            db.execute(insert(ChallengeCompletion), chunk)
+        backfill(db)
+        db.commit()
+    return {"seeded": True, "users": users, "sessions": len(sessions), "completions": len(completions)}
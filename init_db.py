@@ -3,19 +3,29 @@ Database initialization script for Neon Postgres
 Run this once to create all tables in your Neon database
 """
 from app.database import Base, engine
-from app.models import User, Challenge, ChallengeStep, ChallengeCompletion, Session
+from app.migrations import upgrade
+from app.models import User, Challenge, ChallengeStep, CatalogState, ChallengeCompletion, ChallengeCursor, Session, UserDailyStat, UserProgress, UserWeeklyPoints, SchemaMigration
+
 
 def init_database():
     """Create all tables in the database"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    for m in upgrade(engine):
+        print(f"Applied migration {m.version}: {m.description}")
     print("✓ Database tables created successfully!")
     print("\nTables created:")
     print("  - users")
     print("  - challenges")
     print("  - challenge_steps")
+    print("  - catalog_state")
     print("  - challenge_completions")
+    print("  - challenge_cursors")
     print("  - sessions")
+    print("  - user_daily_stats")
+    print("  - user_progress")
+    print("  - user_weekly_points")
+    print("  - schema_migrations")
 
 if __name__ == "__main__":
     init_database()